@@ -1,9 +1,23 @@
 import streamlit as st
-from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
 from datetime import datetime
-import time
+import hashlib
+import io
+import json
 import os
-import httpx
+import socket
+import time
+import uuid
+
+import chat_worker
+import context_encoder
+import cost_estimator
+import knowledge_base
+import map_reduce
+import patches
+import state_store
+import task_graph
+import telemetry
+import trace_profile
 
 st.set_page_config(
     page_title="CrewAI System Debugger",
@@ -116,35 +130,61 @@ if 'error_log' not in st.session_state:
     st.session_state.error_log = ''
 if 'processing' not in st.session_state:
     st.session_state.processing = False
+if 'active_job' not in st.session_state:
+    st.session_state.active_job = None
+if 'job_queue' not in st.session_state:
+    st.session_state.job_queue = []
+if 'last_error' not in st.session_state:
+    st.session_state.last_error = None
+if 'error_fingerprint' not in st.session_state:
+    st.session_state.error_fingerprint = None
+if 'known_diagnosis' not in st.session_state:
+    st.session_state.known_diagnosis = None
+if 'resume_messages' not in st.session_state:
+    st.session_state.resume_messages = []
+if 'compact_context' not in st.session_state:
+    st.session_state.compact_context = True
+if 'context_report' not in st.session_state:
+    st.session_state.context_report = {}
+if 'original_files' not in st.session_state:
+    st.session_state.original_files = {}
+if 'context_refresh' not in st.session_state:
+    st.session_state.context_refresh = False
+if 'trace_profile' not in st.session_state:
+    st.session_state.trace_profile = None
+if 'prefetch_enabled' not in st.session_state:
+    st.session_state.prefetch_enabled = False
+if 'prefetched' not in st.session_state:
+    st.session_state.prefetched = []
+if 'crew_analysis' not in st.session_state:
+    st.session_state.crew_analysis = None
 
-def build_conversation_context():
-    """Build context from uploaded files and error log"""
-    context = "Here are the uploaded CrewAI system files:\n\n"
-    
-    if 'agents' in st.session_state.files:
-        context += f"## AGENTS.YAML\n```yaml\n{st.session_state.files['agents']}\n```\n\n"
-    if 'tasks' in st.session_state.files:
-        context += f"## TASKS.YAML\n```yaml\n{st.session_state.files['tasks']}\n```\n\n"
-    if 'tools' in st.session_state.files:
-        context += f"## TOOLS.PY\n```python\n{st.session_state.files['tools']}\n```\n\n"
-    if 'crew' in st.session_state.files:
-        context += f"## CREW.PY\n```python\n{st.session_state.files['crew']}\n```\n\n"
-    if 'main' in st.session_state.files:
-        context += f"## MAIN.PY\n```python\n{st.session_state.files['main']}\n```\n\n"
-    
-    if st.session_state.error_log.strip():
-        context += f"## ERROR LOG\n```\n{st.session_state.error_log}\n```\n\n"
-    
-    return context
+# Session keys mirrored to the shared state backend so any worker can serve the next turn
+SHARED_SESSION_KEYS = ['conversation_history', 'files_uploaded', 'files', 'error_log', 'processing',
+                       'error_fingerprint', 'known_diagnosis', 'last_error', 'compact_context',
+                       'original_files', 'context_refresh', 'trace_profile', 'prefetch_enabled']
+SESSION_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_TTL = 24 * 3600
+LEASE_TTL = 15
+RATE_LIMIT_PER_MINUTE = int(os.environ.get("CREWAI_DEBUGGER_RATE_LIMIT", "20"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+MAX_PATCH_CORRECTIONS = 2
+# Predicted follow-ups prefetched per session after the initial analysis (0 disables prefetching)
+PREFETCH_MAX_REQUESTS = int(os.environ.get("CREWAI_DEBUGGER_PREFETCH", "3"))
+PROFILE_TABLE_ROWS = 50
 
-def send_message(user_message, initial=False):
-    """Send message to Claude API with custom HTTP client"""
-    max_retries = 3
-    retry_delay = 3
-    
-    for attempt in range(max_retries):
-        try:
-            system_prompt = """You are an expert CrewAI test engineer with over 15 years of experience in debugging and optimizing multi-agent systems. You are having a conversation with a developer who needs help with their CrewAI implementation.
+# Restore a session that another worker (or a crashed process) was serving
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+    saved = state_store.get_backend().get(f"session:{st.session_state.session_id}")
+    if saved:
+        for key in SHARED_SESSION_KEYS:
+            if key in saved:
+                st.session_state[key] = saved[key]
+        st.session_state.resume_messages = saved.get("pending", [])
+
+SYSTEM_PROMPT = """You are an expert CrewAI test engineer with over 15 years of experience in debugging and optimizing multi-agent systems. You are having a conversation with a developer who needs help with their CrewAI implementation.
 
 ## Your Role
 - Provide conversational, helpful responses
@@ -170,6 +210,7 @@ def send_message(user_message, initial=False):
 - **Task Dependencies**: Validate task ordering and dependencies
 - **Context Usage**: Check if context from previous tasks is properly referenced
 - **Common Issues**: Ambiguous descriptions, missing expected_output, incorrect agent assignments, circular dependencies
+- **Parallelism**: Use the TASK GRAPH section (computed locally) to point out cycles, the critical path and independent tasks that could use async_execution or a narrower context
 
 ### 3. TOOLS.PY VALIDATION
 - **Import Statements**: Verify all required libraries are imported
@@ -183,6 +224,7 @@ def send_message(user_message, initial=False):
 - **Task Instantiation**: Check tasks are properly loaded with correct parameters
 - **Crew Configuration**: Validate process type (sequential/hierarchical)
 - **Manager LLM**: If hierarchical, ensure manager_llm is configured
+- **Cost & Latency**: Use the RUN COST ESTIMATE section (computed locally) to explain which settings - max_iter, allow_delegation, hierarchical process, context chaining, tool counts - drive LLM calls and tokens, and how to bound them
 
 ### 5. MAIN.PY VALIDATION
 - **Crew Initialization**: Check if crew is properly imported and instantiated
@@ -197,6 +239,11 @@ def send_message(user_message, initial=False):
 - Provide targeted solutions for runtime errors
 - Explain error propagation and dependencies
 
+## Proposing Fixes
+- Give every code or configuration change as a unified diff in a ```diff block against the uploaded file, with `--- a/<file>` and `+++ b/<file>` headers (agents.yaml, tasks.yaml, tools.py, crew.py or main.py) and correct `@@` hunk headers
+- Include enough unchanged context lines for the hunk to apply, and keep indentation exact; for compacted files, copy context lines as shown (the `#@N` markers can be left out) and use original line numbers in `@@` headers
+- Diffs are applied and validated automatically; explain each change in prose next to its diff
+
 ## Response Style
 - Be conversational and friendly
 - Break down complex issues into digestible parts
@@ -204,118 +251,597 @@ def send_message(user_message, initial=False):
 - Ask clarifying questions when needed
 - Acknowledge progress and celebrate fixes"""
 
-            messages = []
-            
-            # Add context on first message
-            if initial:
-                full_message = build_conversation_context() + "\n" + user_message
-                messages.append({"role": "user", "content": full_message})
-            else:
-                # Build conversation history
-                for msg in st.session_state.conversation_history:
-                    messages.append({
-                        "role": msg["role"],
-                        "content": msg["content"]
-                    })
-                messages.append({"role": "user", "content": user_message})
-
-            # Get API key
-            api_key = None
-            if hasattr(st, 'secrets') and "ANTHROPIC_API_KEY" in st.secrets:
-                api_key = st.secrets["ANTHROPIC_API_KEY"]
-            elif "ANTHROPIC_API_KEY" in os.environ:
-                api_key = os.environ["ANTHROPIC_API_KEY"]
-            else:
-                st.error("❌ API key not found. Please add ANTHROPIC_API_KEY to your Streamlit secrets.")
-                return False
-            
-            # Create custom HTTP client with longer timeouts and retry configuration
-            http_client = httpx.Client(
-                timeout=httpx.Timeout(120.0, connect=60.0),
-                limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
-                follow_redirects=True,
-                verify=True
-            )
-            
-            # Initialize Anthropic client with custom HTTP client
-            client = Anthropic(
-                api_key=api_key,
-                http_client=http_client,
-                max_retries=2
-            )
-            
-            # Make API call
-            message = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=8000,
-                system=system_prompt,
-                messages=messages
-            )
-            
-            assistant_message = message.content[0].text
-            
-            # Close HTTP client
-            http_client.close()
-            
-            # Add messages to conversation history
-            st.session_state.conversation_history.append({
-                "role": "user",
-                "content": user_message,
-                "timestamp": datetime.now().isoformat()
-            })
-            st.session_state.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_message,
-                "timestamp": datetime.now().isoformat()
+def build_conversation_context():
+    """Build context from uploaded files and error log"""
+    with telemetry.span("context.build") as context_span:
+        context = _build_conversation_context()
+        context_span.set(chars=len(context))
+    return context
+
+def _file_section(key, title, language):
+    """Markdown section for one uploaded file, compacted when enabled"""
+    content = st.session_state.files[key]
+    if st.session_state.compact_context:
+        report = context_encoder.encode_file(content, language)
+        st.session_state.context_report[key] = {k: v for k, v in report.items() if k not in ("text", "line_map")}
+        if report["encoded"]:
+            return f"## {title} (compacted)\n```{language}\n{report['text']}\n```\n\n"
+    return f"## {title}\n```{language}\n{content}\n```\n\n"
+
+def _build_conversation_context():
+    context = "Here are the uploaded CrewAI system files:\n\n"
+    st.session_state.context_report = {}
+    
+    if 'agents' in st.session_state.files:
+        context += _file_section('agents', "AGENTS.YAML", "yaml")
+    if 'tasks' in st.session_state.files:
+        context += _file_section('tasks', "TASKS.YAML", "yaml")
+    if 'tools' in st.session_state.files:
+        context += _file_section('tools', "TOOLS.PY", "python")
+    if 'crew' in st.session_state.files:
+        context += _file_section('crew', "CREW.PY", "python")
+    if 'main' in st.session_state.files:
+        context += _file_section('main', "MAIN.PY", "python")
+    
+    if any(report["encoded"] for report in st.session_state.context_report.values()):
+        context = context_encoder.CONTEXT_NOTE + context
+    
+    if st.session_state.error_log.strip():
+        context += f"## ERROR LOG\n```\n{st.session_state.error_log}\n```\n\n"
+    
+    context += _analysis_sections()
+    return context
+
+def crew_analysis():
+    """Cost estimate and task graph of the uploaded files, recomputed only when the files or run profile change"""
+    profile = st.session_state.trace_profile
+    key = hashlib.sha256(json.dumps(
+        [st.session_state.files, profile["task_totals"] if profile else None], sort_keys=True
+    ).encode("utf-8")).hexdigest()
+    cached = st.session_state.crew_analysis
+    if cached is None or cached[0] != key:
+        estimate = cost_estimator.estimate_crew(st.session_state.files)
+        graph = task_graph.build_graph(st.session_state.files, profile, estimate)
+        cached = st.session_state.crew_analysis = (key, estimate, graph)
+    return cached[1], cached[2]
+
+def _analysis_sections():
+    """Locally computed estimate, task graph and run profile sections"""
+    sections = ""
+    if 'agents' in st.session_state.files and 'tasks' in st.session_state.files:
+        estimate, graph = crew_analysis()
+        sections += f"## RUN COST ESTIMATE\n{cost_estimator.compact_summary(estimate)}\n\n"
+        if graph:
+            sections += f"## TASK GRAPH\n{task_graph.compact_summary(graph)}\n\n"
+    
+    if st.session_state.trace_profile:
+        sections += f"## EXECUTION PROFILE\n{trace_profile.compact_summary(st.session_state.trace_profile)}\n\n"
+    
+    return sections
+
+def get_api_key():
+    """Read the Anthropic API key from Streamlit secrets or the environment"""
+    if hasattr(st, 'secrets') and "ANTHROPIC_API_KEY" in st.secrets:
+        return st.secrets["ANTHROPIC_API_KEY"]
+    if "ANTHROPIC_API_KEY" in os.environ:
+        return os.environ["ANTHROPIC_API_KEY"]
+    return None
+
+def build_messages(user_message, initial=False):
+    """Build the API message list for a new user turn"""
+    messages = []
+    
+    # Add context on first message
+    if initial:
+        full_message = build_conversation_context() + "\n" + user_message
+        messages.append({"role": "user", "content": full_message})
+    else:
+        # Build conversation history
+        for msg in st.session_state.conversation_history:
+            messages.append({
+                "role": msg["role"],
+                "content": msg.get("sent_content", msg["content"])
             })
-            
-            return True
-            
-        except httpx.ConnectTimeout:
-            if attempt < max_retries - 1:
-                st.warning(f"⏱️ Connection timeout on attempt {attempt + 1}. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                continue
-            else:
-                st.error("❌ Connection Timeout: The request took too long to connect. This might be a Streamlit Cloud network restriction. Please try:\n\n1. Refresh the page and try again\n2. Check if Anthropic API is accessible from your region\n3. Contact Streamlit support about API access restrictions")
-                return False
-                
-        except httpx.ReadTimeout:
-            if attempt < max_retries - 1:
-                st.warning(f"⏱️ Read timeout on attempt {attempt + 1}. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                continue
-            else:
-                st.error("❌ Read Timeout: The API took too long to respond. Your files might be too large. Try:\n\n1. Reducing file sizes\n2. Removing the error log temporarily\n3. Trying again in a moment")
-                return False
-                
-        except httpx.ConnectError as e:
-            if attempt < max_retries - 1:
-                st.warning(f"🔌 Network error on attempt {attempt + 1}. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                continue
+        if st.session_state.context_refresh:
+            # The user switched to the patched files; send them with this turn
+            st.session_state.context_refresh = False
+            user_message = ("The files have been updated with your validated patches. "
+                            + build_conversation_context() + "\n" + user_message)
+        messages.append({"role": "user", "content": user_message})
+    
+    return messages
+
+def session_key():
+    return f"session:{st.session_state.session_id}"
+
+def lease_key():
+    return f"lease:{st.session_state.session_id}"
+
+def save_session():
+    """Write the shareable part of this session to the state backend"""
+    backend = state_store.get_backend()
+    if not backend.shared:
+        # No other worker can read a process-local backend; the session already lives in st.session_state
+        return
+    saved = {key: st.session_state[key] for key in SHARED_SESSION_KEYS}
+    # Turns still in flight are saved so another worker can resume them
+    jobs = ([st.session_state.active_job] if st.session_state.active_job is not None else []) + st.session_state.job_queue
+    saved["pending"] = [{"content": job.user_message, "initial": job.initial} for job in jobs]
+    backend.set(session_key(), saved, ttl=SESSION_TTL)
+
+def resume_pending_messages():
+    """Re-dispatch turns left in flight by another worker; returns False while that worker still holds the session"""
+    if not st.session_state.resume_messages:
+        return True
+    
+    backend = state_store.get_backend()
+    saved = backend.get(session_key())
+    if saved:
+        for key in SHARED_SESSION_KEYS:
+            if key in saved:
+                st.session_state[key] = saved[key]
+    pending = saved.get("pending", []) if saved else []
+    if not pending:
+        st.session_state.resume_messages = []
+        return True
+    if not backend.add(lease_key(), WORKER_ID, ttl=LEASE_TTL):
+        return False
+    
+    st.session_state.resume_messages = []
+    for message in pending:
+        st.session_state.job_queue.append(chat_worker.ChatJob(message["content"], initial=message["initial"]))
+    start_next_job()
+    return True
+
+def response_cache_key(messages):
+    return "response:" + hashlib.sha256(
+        json.dumps([chat_worker.MODEL, SYSTEM_PROMPT, messages]).encode("utf-8")
+    ).hexdigest()
+
+def start_next_job():
+    """Dispatch the next queued turn if nothing is running for this session"""
+    if st.session_state.active_job is not None or not st.session_state.job_queue:
+        return
+    
+    api_key = get_api_key()
+    if api_key is None:
+        st.session_state.job_queue = []
+        st.session_state.last_error = "❌ API key not found. Please add ANTHROPIC_API_KEY to your Streamlit secrets."
+        return
+    
+    job = st.session_state.job_queue.pop(0)
+    # Messages are built at dispatch time so queued follow-ups see earlier answers
+    messages = build_messages(job.user_message, initial=job.initial)
+    job.sent_content = messages[-1]["content"]
+    
+    backend = state_store.get_backend()
+    backend.set(lease_key(), WORKER_ID, ttl=LEASE_TTL)
+    if map_reduce.needs_map_reduce(job.sent_content):
+        start_map_reduce(job, api_key, messages)
+        return
+    job.cache_key = response_cache_key(messages)
+    cached = backend.get(job.cache_key)
+    if cached is not None:
+        telemetry.incr("cache_hits_total", cache="response")
+        job.partial = cached
+        job.status = "done"
+        st.session_state.active_job = job
+        return
+    
+    st.session_state.active_job = chat_worker.submit(job, api_key, SYSTEM_PROMPT, messages)
+
+def start_map_reduce(job, api_key, messages):
+    """Analyze files too large for one request chunk by chunk, then merge the findings"""
+    files = st.session_state.files
+    with telemetry.span("map_reduce.plan") as plan_span:
+        chunks = map_reduce.chunk_files(files)
+        outline = map_reduce.symbol_outline(files)
+        plan_span.set(chunks=len(chunks))
+    map_requests = [
+        (chunk["name"], [{"role": "user", "content": map_reduce.map_content(
+            outline, chunk, index, len(chunks), st.session_state.error_log)}])
+        for index, chunk in enumerate(chunks, start=1)
+    ]
+    # Built here because worker threads can't read session state
+    extra_sections = _analysis_sections()
+    history = messages[:-1]
+    question = job.user_message
+    
+    def reduce(findings):
+        content = map_reduce.reduce_content(outline, chunks, findings, question, extra_sections)
+        return history + [{"role": "user", "content": content}]
+    
+    # The merged prompt differs from the full context, so the response cache is not used
+    job.cache_key = None
+    st.session_state.active_job = chat_worker.submit_map_reduce(
+        job, api_key, SYSTEM_PROMPT, map_requests, reduce, map_reduce.MAP_MAX_TOKENS)
+
+def send_message(user_message, initial=False):
+    """Queue a message for the background worker"""
+    st.session_state.last_error = None
+    
+    if RATE_LIMIT_PER_MINUTE:
+        window = int(time.time() // 60)
+        count = state_store.get_backend().incr(f"rate:{st.session_state.session_id}:{window}", ttl=60)
+        if count > RATE_LIMIT_PER_MINUTE:
+            st.session_state.last_error = "❌ Rate Limit: Too many requests. Please wait a moment and try again."
+            return False
+    
+    st.session_state.job_queue.append(chat_worker.ChatJob(user_message, initial=initial))
+    start_next_job()
+    save_session()
+    return True
+
+def commit_active_job():
+    """Move a finished job's output into the conversation history"""
+    job = st.session_state.active_job
+    if job is None or not job.finished:
+        return
+    
+    st.session_state.active_job = None
+    
+    # Partial output from a stopped generation is kept
+    if job.status == "done" or (job.status == "cancelled" and job.partial):
+        user_entry = {
+            "role": "user",
+            "content": job.user_message,
+            "timestamp": job.created_at
+        }
+        # Keep what the model actually saw (file context included) for later turns
+        if job.sent_content and job.sent_content != job.user_message:
+            user_entry["sent_content"] = job.sent_content
+        if job.auto:
+            user_entry["auto"] = True
+        assistant_entry = {
+            "role": "assistant",
+            "content": job.partial,
+            "timestamp": datetime.now().isoformat(),
+            "stopped": job.status == "cancelled"
+        }
+        if job.status == "done":
+            results = patches.process_answer(job.partial, st.session_state.files,
+                                             compacted=st.session_state.compact_context)
+            if results:
+                assistant_entry["patches"] = results
+            # Only patches that failed validation go back for another round
+            if any(not result["ok"] for result in results) and job.correction_round < MAX_PATCH_CORRECTIONS:
+                correction = chat_worker.ChatJob(patches.correction_request(results))
+                correction.auto = True
+                correction.correction_round = job.correction_round + 1
+                st.session_state.job_queue.insert(0, correction)
+        st.session_state.conversation_history.append(user_entry)
+        st.session_state.conversation_history.append(assistant_entry)
+    elif job.status == "error":
+        st.session_state.last_error = job.error
+    
+    backend = state_store.get_backend()
+    if job.status == "done" and job.cache_key:
+        backend.set(job.cache_key, job.partial, ttl=RESPONSE_CACHE_TTL)
+    
+    start_next_job()
+    if st.session_state.active_job is None:
+        backend.delete(lease_key())
+        # Prefetch only once the analysis has settled (no correction round pending)
+        if job.initial and job.status == "done" and st.session_state.prefetch_enabled:
+            start_prefetch(job.partial)
+    save_session()
+
+def predicted_follow_ups(answer):
+    """The questions users most often ask right after the initial analysis"""
+    questions = ["Give me step-by-step fixes for the top issues you found, most important first."]
+    mentions = {
+        name: answer.count(name)
+        for key, name in patches.FILE_NAMES.items()
+        if key in st.session_state.files and answer.count(name)
+    }
+    for name in sorted(mentions, key=mentions.get, reverse=True):
+        questions.append(f"Show me the corrected {name} with all the fixes applied, as a unified diff.")
+    return questions[:PREFETCH_MAX_REQUESTS]
+
+def start_prefetch(answer):
+    """Fire low-priority background requests for the predicted follow-ups"""
+    api_key = get_api_key()
+    if api_key is None or st.session_state.context_refresh:
+        return
+    backend = state_store.get_backend()
+    for question in predicted_follow_ups(answer):
+        job = chat_worker.ChatJob(question)
+        job.speculative = True
+        job.history_length = len(st.session_state.conversation_history)
+        messages = build_messages(question)
+        job.sent_content = messages[-1]["content"]
+        job.cache_key = response_cache_key(messages)
+        cached = backend.get(job.cache_key)
+        if cached is not None:
+            job.partial = cached
+            job.status = "done"
+        else:
+            chat_worker.submit(job, api_key, SYSTEM_PROMPT, messages)
+        telemetry.incr("prefetch_requests_total", outcome="launched")
+        st.session_state.prefetched.append(job)
+
+def cancel_prefetch():
+    """Drop prefetched answers once the conversation moves on without them"""
+    for job in st.session_state.prefetched:
+        if not job.finished:
+            job.cancel()
+            telemetry.incr("prefetch_requests_total", outcome="cancelled")
+        elif job.status == "done":
+            telemetry.incr("prefetch_requests_total", outcome="unused")
+    st.session_state.prefetched = []
+
+def use_prefetched(job):
+    """Answer a suggested question from its prefetched job, or send it normally if that failed"""
+    st.session_state.prefetched = [other for other in st.session_state.prefetched if other is not job]
+    cancel_prefetch()
+    # A job still waiting on the low-priority pool would make a real turn queue behind other sessions'
+    # speculative work, so only answers that have started are adopted; the rest go to the main pool
+    usable = job.status not in ("queued", "cancelled", "error") \
+        and job.history_length == len(st.session_state.conversation_history) \
+        and st.session_state.active_job is None and not st.session_state.job_queue
+    if not usable:
+        job.cancel()
+        telemetry.incr("prefetch_requests_total", outcome="miss")
+        send_message(job.user_message)
+        return
+    # A finished answer shows instantly; a running one keeps streaming as the active turn
+    telemetry.incr("prefetch_requests_total", outcome="hit" if job.finished else "partial_hit")
+    state_store.get_backend().set(lease_key(), WORKER_ID, ttl=LEASE_TTL)
+    st.session_state.active_job = job
+    save_session()
+
+def cancel_all_jobs():
+    """Stop the running turn and drop any queued follow-ups"""
+    cancel_prefetch()
+    for job in st.session_state.job_queue:
+        job.cancel()
+    st.session_state.job_queue = []
+    if st.session_state.active_job is not None:
+        st.session_state.active_job.cancel()
+        st.session_state.active_job = None
+
+def use_patched_files(results):
+    """Make validated patches the working files for the next turn; returns the names of stale files
+
+    Patches are only used while their files are still the ones they were
+    built from, so using an older answer's patches never discards changes
+    made since then.
+    """
+    # Later patches for the same file in one answer build on the earlier ones
+    latest = {result["file"]: result for result in results if result["ok"]}
+    stale = [result["name"] for key, result in latest.items()
+             if patches.digest(st.session_state.files[key]) != result.get("base")]
+    if stale:
+        return stale
+    if not st.session_state.original_files:
+        st.session_state.original_files = dict(st.session_state.files)
+    for key, result in latest.items():
+        st.session_state.files[key] = result["text"]
+    st.session_state.context_refresh = True
+    cancel_prefetch()
+    save_session()
+    return []
+
+def revert_to_original_files():
+    """Go back to the files as uploaded, undoing every patch that was used"""
+    st.session_state.files = dict(st.session_state.original_files)
+    st.session_state.original_files = {}
+    st.session_state.context_refresh = True
+    cancel_prefetch()
+    save_session()
+
+def render_patches(results, index):
+    """Show validation results and downloads for the diffs in one answer"""
+    for number, result in enumerate(results):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            if result["ok"]:
+                st.success(f"✅ Patch for **{result['name']}** applies cleanly and passes local validation")
             else:
-                st.error(f"❌ Network Connection Failed: Cannot reach Anthropic API.\n\n**This is likely a Streamlit Cloud limitation.**\n\nWorkarounds:\n1. Deploy on a different platform (Hugging Face Spaces, Render, Railway)\n2. Run locally: `streamlit run streamlit_app.py`\n3. Use a proxy service\n\nTechnical details: {str(e)}")
-                return False
-        
-        except Exception as e:
-            error_type = type(e).__name__
-            if "Authentication" in error_type or "401" in str(e):
-                st.error("❌ Authentication Error: Invalid API key. Please verify your ANTHROPIC_API_KEY in secrets.")
-                return False
-            elif "RateLimit" in error_type or "429" in str(e):
-                st.error("❌ Rate Limit: Too many requests. Please wait a moment and try again.")
-                return False
+                st.warning(f"⚠️ Patch for **{result['name']}** failed validation: " + "; ".join(result["errors"]))
+        with col2:
+            if result["ok"]:
+                st.download_button(
+                    label=f"Download {result['name']}",
+                    data=result["text"],
+                    file_name=result["name"],
+                    mime="text/plain",
+                    key=f"patch-download-{index}-{number}",
+                    use_container_width=True
+                )
+    if any(result["ok"] for result in results):
+        if st.button("Use patched files for my next question", key=f"use-patches-{index}"):
+            stale = use_patched_files(results)
+            if stale:
+                st.warning(f"{', '.join(stale)} changed after this answer, so using its patches would undo "
+                           "those changes. Ask for the fix again against the current files.")
             else:
-                if attempt < max_retries - 1:
-                    st.warning(f"⚠️ Error on attempt {attempt + 1}: {error_type}. Retrying...")
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    st.error(f"❌ Error: {error_type}: {str(e)}\n\nIf this persists, Streamlit Cloud may be blocking external API calls. Consider running locally or deploying elsewhere.")
-                    return False
+                st.toast("Patched files will be sent with your next question")
+
+def render_message(role, content, timestamp, stopped=False, auto=False):
+    """Render a single chat bubble"""
+    time_label = datetime.fromisoformat(timestamp).strftime("%H:%M:%S")
+    if role == "user":
+        sender = "🔁 Automatic patch check" if auto else "You"
+        st.markdown(f"""
+        <div class="chat-message user-message">
+            <div class="message-role">{sender} • {time_label}</div>
+            <div class="message-content">{content}</div>
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown(f"""
+        <div class="chat-message assistant-message">
+            <div class="message-role">AI Assistant • {time_label}</div>
+            <div class="message-content">
+        """, unsafe_allow_html=True)
+        st.markdown(content, unsafe_allow_html=True)
+        if stopped:
+            st.caption("⏹️ Generation stopped - partial response")
+        st.markdown("</div></div>", unsafe_allow_html=True)
+
+@st.fragment(run_every=0.5)
+def show_active_job():
+    """Poll the running job, streaming partial output until it finishes"""
+    job = st.session_state.active_job
+    if job is None:
+        return
+    if job.finished:
+        # Full rerun so the result lands in the history above
+        st.rerun()
     
-    return False
+    # Keep ownership of the session while this worker is streaming
+    state_store.get_backend().set(lease_key(), WORKER_ID, ttl=LEASE_TTL)
+    
+    render_message("user", job.user_message, job.created_at, auto=job.auto)
+    for notice in job.notices:
+        st.warning(notice)
+    
+    if job.chunks:
+        done = sum(chunk["status"] in ("done", "error", "cancelled") for chunk in job.chunks)
+        st.progress(done / len(job.chunks),
+                    text=f"Large project: {done} of {len(job.chunks)} chunks analyzed"
+                         + (" - merging findings" if done == len(job.chunks) and not job.partial else ""))
+        icons = {"queued": "⏸️", "running": "⏳", "retrying": "🔁", "done": "✅", "error": "⚠️", "cancelled": "⏹️"}
+        with st.expander("Chunk progress", expanded=not job.partial):
+            st.markdown("\n".join(f"- {icons.get(chunk['status'], '')} {chunk['name']}" for chunk in job.chunks))
+    
+    if job.partial:
+        render_message("assistant", job.partial, datetime.now().isoformat())
+    elif job.chunks:
+        st.info("⏳ Your project is larger than one request, so it is being analyzed in chunks...")
+    elif job.initial:
+        st.info("⏳ Analyzing your CrewAI system... This may take a moment.")
+    else:
+        st.info("⏳ Thinking...")
+    
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        if st.session_state.job_queue:
+            st.caption(f"{len(st.session_state.job_queue)} follow-up(s) queued: " +
+                       " • ".join(queued.user_message for queued in st.session_state.job_queue))
+    with col2:
+        if st.button("⏹️ Stop", use_container_width=True):
+            job.cancel()
+
+def profile_trace(uploaded_file):
+    """Profile an uploaded run log line by line without decoding it all at once"""
+    progress = st.progress(0.0, text="Profiling run log...")
+    size = max(uploaded_file.size, 1)
+    
+    def update(lines):
+        progress.progress(min(uploaded_file.tell() / size, 1.0), text=f"Profiling run log... {lines:,} lines")
+    
+    with telemetry.span("trace.profile", bytes=uploaded_file.size) as profile_span:
+        stream = io.TextIOWrapper(uploaded_file, encoding="utf-8", errors="replace")
+        profile = trace_profile.profile_stream(stream, progress=update)
+        profile_span.set(lines=profile["lines"], events=profile["events"])
+    progress.empty()
+    return profile
+
+def render_trace_profile(profile):
+    """Expander with the per-task, per-agent and per-tool timings of an uploaded run"""
+    wall = f"{profile['wall_time']:.1f}s" if profile["wall_time"] is not None else "untimed"
+    with st.expander(f"⏱️ Execution profile: {profile['task_count']} task runs, {wall}"):
+        for spot in profile["hot_spots"]:
+            st.warning(spot)
+        if profile["tasks"]:
+            st.markdown("**Tasks**")
+            st.table([
+                {
+                    "Task": task["name"][:80],
+                    "Agent": task["agent"] or "",
+                    "Duration (s)": round(task["duration"], 1) if task["duration"] is not None else None,
+                    "Iterations": task["iterations"],
+                    "Tool calls": task["tool_calls"],
+                    "Status": task["status"],
+                }
+                for task in profile["tasks"][:PROFILE_TABLE_ROWS]
+            ])
+            if profile["task_count"] > PROFILE_TABLE_ROWS:
+                st.caption(f"First {PROFILE_TABLE_ROWS} of {profile['task_count']:,} task runs.")
+        if profile["agents"]:
+            st.markdown("**Agents**")
+            st.table([
+                {"Agent": role, "Tasks": agent["tasks"], "Iterations": agent["iterations"],
+                 "LLM calls": agent["llm_calls"], "Tool calls": agent["tool_calls"],
+                 "Busy (s)": round(agent["duration"], 1)}
+                for role, agent in profile["agents"].items()
+            ])
+        if profile["tools"]:
+            st.markdown("**Tools**")
+            st.table([
+                {"Tool": name, "Calls": tool["calls"], "Errors": tool["errors"],
+                 "Time (s)": round(tool["duration"], 1)}
+                for name, tool in sorted(profile["tools"].items(), key=lambda item: item[1]["calls"], reverse=True)
+            ])
+        st.caption(f"{profile['lines']:,} lines, {profile['events']:,} events. "
+                   "Only a short summary of this profile is sent to the assistant.")
+
+def render_cost_estimate(estimate):
+    """Expander with the static per-task call, token and time bounds"""
+    totals = estimate["totals"]
+    with st.expander(f"💰 Run cost estimate: {totals['calls'][0]:,}-{totals['calls'][1]:,} LLM calls, "
+                     f"~{totals['input_tokens'][0]:,}-{totals['input_tokens'][1]:,} input tokens",
+                     expanded=bool(estimate["flags"]) and len(st.session_state.conversation_history) == 0):
+        for flag in estimate["flags"]:
+            st.warning(flag)
+        st.table([
+            {
+                "Task": result["name"],
+                "Agent": result["agent"] or "",
+                "Tools": result["tools"],
+                "LLM calls": f"{result['calls'][0]:,} - {result['calls'][1]:,}",
+                "Input tokens": f"{result['input_tokens'][0]:,} - {result['input_tokens'][1]:,}",
+                "Output tokens": f"{result['output_tokens'][0]:,} - {result['output_tokens'][1]:,}",
+                "Time (s)": f"{result['seconds'][0]:,.0f} - {result['seconds'][1]:,.0f}",
+                "Notes": "; ".join(result["notes"]),
+            }
+            for result in estimate["tasks"]
+        ])
+        st.caption(f"Typical - worst case for a {estimate['process']} run, estimated locally from the uploaded "
+                   f"files before kickoff. Total time: {totals['seconds'][0]:,.0f}-{totals['seconds'][1]:,.0f}s.")
+
+def render_task_graph(graph):
+    """Expander with the task dependency graph, its critical path and restructuring hints"""
+    if graph["critical_seconds"] is not None:
+        title = (f"🕸️ Task graph: {len(graph['order'])} tasks, ~{graph['current_seconds']:.0f}s as scheduled, "
+                 f"~{graph['critical_seconds']:.0f}s critical path")
+    else:
+        title = f"🕸️ Task graph: {len(graph['order'])} tasks"
+    with st.expander(title, expanded=bool(graph["issues"]) and len(st.session_state.conversation_history) == 0):
+        for issue in graph["issues"]:
+            st.error(issue)
+        for suggestion in graph["suggestions"]:
+            st.info(suggestion)
+        st.graphviz_chart(task_graph.to_dot(graph))
+        st.caption("Red marks the critical path, dashed boxes are async tasks and dotted edges are implicit "
+                   "context (the previous task's output). Durations are measured from the uploaded run log where "
+                   "task names match, otherwise estimated.")
+
+@st.fragment(run_every=2)
+def show_suggestions():
+    """One-click suggested follow-ups; prefetched answers are marked ready"""
+    if not st.session_state.prefetched:
+        return
+    st.caption("Suggested questions")
+    for index, job in enumerate(st.session_state.prefetched):
+        if job.status == "done":
+            label = f"⚡ {job.user_message}"
+        elif job.finished:
+            label = job.user_message
+        else:
+            label = f"⏳ {job.user_message}"
+        if st.button(label, key=f"suggestion_{index}", use_container_width=True):
+            use_prefetched(job)
+            st.rerun()
+
+@st.fragment(run_every=2)
+def wait_for_other_worker():
+    """Wait until the worker that was answering this session finishes or its lease expires"""
+    st.info("⏳ Another worker is still answering your last message - it will appear here shortly.")
+    if resume_pending_messages():
+        st.rerun()
 
 # Main App Logic
 if not st.session_state.files_uploaded:
@@ -362,6 +888,28 @@ if not st.session_state.files_uploaded:
         label_visibility="collapsed"
     )
     
+    st.header("📈 Run Log / Trace (Optional)")
+    st.caption("Upload the verbose console output or a JSONL event trace of a run. It is profiled locally "
+               "and only a short timing summary is sent to the assistant.")
+    trace_file = st.file_uploader("Upload run log or trace", type=['log', 'txt', 'jsonl', 'json'], key="trace",
+                                  label_visibility="collapsed")
+    
+    compact_context = st.checkbox(
+        "Compact files before sending",
+        value=st.session_state.compact_context,
+        help="Strips comments, blank-line runs and non-essential docstrings to save input tokens. "
+             "Line numbers in answers still refer to your original files. Untick to send the raw text."
+    )
+    
+    prefetch_enabled = st.checkbox(
+        "Prefetch likely follow-up questions",
+        value=st.session_state.prefetch_enabled,
+        disabled=PREFETCH_MAX_REQUESTS <= 0,
+        help=f"After the initial analysis, answers to up to {max(PREFETCH_MAX_REQUESTS, 0)} predicted follow-ups "
+             "are generated in the background so they show up instantly when you click them. Each one is an "
+             "extra API request; they are cancelled as soon as you ask something else."
+    )
+    
     st.markdown("---")
     
     col1, col2 = st.columns([3, 1])
@@ -370,21 +918,33 @@ if not st.session_state.files_uploaded:
     with col2:
         if st.button("Start Debugging Session", type="primary", use_container_width=True,
                     disabled=not (agents_file and tasks_file and crew_file and main_file)):
-            # Store files in session state
-            if agents_file:
-                st.session_state.files['agents'] = agents_file.read().decode('utf-8')
-            if tasks_file:
-                st.session_state.files['tasks'] = tasks_file.read().decode('utf-8')
-            if crew_file:
-                st.session_state.files['crew'] = crew_file.read().decode('utf-8')
-            if main_file:
-                st.session_state.files['main'] = main_file.read().decode('utf-8')
-            if tools_file:
-                st.session_state.files['tools'] = tools_file.read().decode('utf-8')
-            
-            st.session_state.error_log = error_log
+            with telemetry.span("upload.ingest") as ingest_span:
+                # Store files in session state
+                if agents_file:
+                    st.session_state.files['agents'] = agents_file.read().decode('utf-8')
+                if tasks_file:
+                    st.session_state.files['tasks'] = tasks_file.read().decode('utf-8')
+                if crew_file:
+                    st.session_state.files['crew'] = crew_file.read().decode('utf-8')
+                if main_file:
+                    st.session_state.files['main'] = main_file.read().decode('utf-8')
+                if tools_file:
+                    st.session_state.files['tools'] = tools_file.read().decode('utf-8')
+                
+                st.session_state.error_log = error_log
+                st.session_state.error_fingerprint = knowledge_base.fingerprint_traceback(error_log)
+                st.session_state.known_diagnosis = knowledge_base.lookup(st.session_state.error_fingerprint)
+                if st.session_state.known_diagnosis:
+                    telemetry.incr("cache_hits_total", cache="knowledge_base")
+                if trace_file:
+                    st.session_state.trace_profile = profile_trace(trace_file)
+                ingest_span.set(files=len(st.session_state.files),
+                                bytes=sum(len(content) for content in st.session_state.files.values()))
+            st.session_state.compact_context = compact_context
+            st.session_state.prefetch_enabled = prefetch_enabled and PREFETCH_MAX_REQUESTS > 0
             st.session_state.files_uploaded = True
             st.session_state.processing = True
+            save_session()
             st.rerun()
 
 else:
@@ -396,11 +956,20 @@ else:
     
     with col3:
         if st.button("New Session", use_container_width=True):
+            cancel_all_jobs()
             st.session_state.conversation_history = []
             st.session_state.files_uploaded = False
             st.session_state.files = {}
             st.session_state.error_log = ''
             st.session_state.processing = False
+            st.session_state.last_error = None
+            st.session_state.error_fingerprint = None
+            st.session_state.known_diagnosis = None
+            st.session_state.resume_messages = []
+            st.session_state.original_files = {}
+            st.session_state.context_refresh = False
+            st.session_state.trace_profile = None
+            save_session()
             st.rerun()
         
         if len(st.session_state.conversation_history) > 0:
@@ -420,39 +989,86 @@ else:
     
     st.markdown("---")
     
-    # Process initial analysis if needed
+    resumed = resume_pending_messages()
+    
+    # Start the initial analysis in the background
     if st.session_state.processing and len(st.session_state.conversation_history) == 0:
-        with st.spinner("Analyzing your CrewAI system... This may take a moment."):
-            success = send_message("Please analyze my CrewAI system and identify any issues.", initial=True)
-            if success:
-                st.session_state.processing = False
-                st.rerun()
-            else:
-                st.session_state.processing = False
+        st.session_state.processing = False
+        send_message("Please analyze my CrewAI system and identify any issues.", initial=True)
+    
+    commit_active_job()
+    
+    known = st.session_state.known_diagnosis
+    if known:
+        match = "same traceback" if known["exact"] else "same error, different call path"
+        with st.expander(f"🧠 Seen before: {known['exception_type']} previously resolved ({match})",
+                         expanded=len(st.session_state.conversation_history) == 0):
+            st.caption(known["message"])
+            st.markdown(known["diagnosis"], unsafe_allow_html=True)
+    
+    report = st.session_state.context_report
+    if report and any(entry["encoded"] for entry in report.values()):
+        saved = sum(entry["saved_tokens"] for entry in report.values())
+        original = sum(entry["original_tokens"] for entry in report.values())
+        with st.expander(f"📉 Compacted context: ~{saved:,} of ~{original:,} input tokens saved"):
+            st.table([
+                {
+                    "File": key,
+                    "Original (est. tokens)": entry["original_tokens"],
+                    "Sent (est. tokens)": entry["encoded_tokens"],
+                    "Saved": f"{entry['saved_tokens'] / entry['original_tokens']:.0%}" if entry["original_tokens"] else "0%",
+                    "Mode": "compacted" if entry["encoded"] else "raw",
+                }
+                for key, entry in report.items()
+            ])
+    
+    if 'agents' in st.session_state.files and 'tasks' in st.session_state.files:
+        estimate, graph = crew_analysis()
+        if estimate["tasks"]:
+            render_cost_estimate(estimate)
+        if graph and graph["order"]:
+            render_task_graph(graph)
+    
+    if st.session_state.trace_profile:
+        render_trace_profile(st.session_state.trace_profile)
     
     # Display conversation history
     if len(st.session_state.conversation_history) > 0:
         chat_container = st.container()
-        with chat_container:
-            for msg in st.session_state.conversation_history:
-                if msg["role"] == "user":
-                    st.markdown(f"""
-                    <div class="chat-message user-message">
-                        <div class="message-role">You • {datetime.fromisoformat(msg["timestamp"]).strftime("%H:%M:%S")}</div>
-                        <div class="message-content">{msg["content"]}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="chat-message assistant-message">
-                        <div class="message-role">AI Assistant • {datetime.fromisoformat(msg["timestamp"]).strftime("%H:%M:%S")}</div>
-                        <div class="message-content">
-                    """, unsafe_allow_html=True)
-                    st.markdown(msg["content"], unsafe_allow_html=True)
-                    st.markdown("</div></div>", unsafe_allow_html=True)
-    else:
+        with chat_container, telemetry.span("chat.render", messages=len(st.session_state.conversation_history)):
+            for index, msg in enumerate(st.session_state.conversation_history):
+                render_message(msg["role"], msg["content"], msg["timestamp"], msg.get("stopped", False), msg.get("auto", False))
+                if msg.get("patches"):
+                    render_patches(msg["patches"], index)
+    elif st.session_state.active_job is None:
         st.info("Waiting for initial analysis...")
     
+    if st.session_state.active_job is not None:
+        show_active_job()
+    elif not resumed:
+        wait_for_other_worker()
+    
+    if st.session_state.last_error:
+        st.error(st.session_state.last_error)
+    
+    if st.session_state.original_files and st.session_state.active_job is None:
+        if st.button("↩️ Revert to uploaded files", help="Undo the patches used so far"):
+            revert_to_original_files()
+            st.toast("Your next question will use the files as uploaded")
+    
+    if (st.session_state.error_fingerprint and st.session_state.active_job is None
+            and len(st.session_state.conversation_history) > 0):
+        if st.button("✅ This fixed my error", help="Save the latest answer as the known fix for this traceback"):
+            knowledge_base.record(
+                st.session_state.error_fingerprint,
+                st.session_state.conversation_history[-1]["content"],
+                resolved=True
+            )
+            st.toast("Saved - this fix will be suggested the next time this error shows up")
+    
+    if st.session_state.prefetched and st.session_state.active_job is None and not st.session_state.job_queue:
+        show_suggestions()
+    
     # Input area
     st.markdown("---")
     
@@ -469,7 +1085,14 @@ else:
             send_button = st.form_submit_button("Send", type="primary", use_container_width=True)
     
     if send_button and user_input.strip():
-        with st.spinner("Thinking..."):
+        prefetched = next((job for job in st.session_state.prefetched
+                           if job.user_message == user_input.strip()), None)
+        if prefetched is not None:
+            use_prefetched(prefetched)
+        else:
+            # Asking something else makes the predicted answers stale
+            cancel_prefetch()
+            # Follow-ups sent while a response is streaming wait in the queue
             send_message(user_input)
         st.rerun()
 
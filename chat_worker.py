@@ -0,0 +1,315 @@
+"""Background execution of Claude API calls for the debugger chat.
+
+Streamlit reruns the whole script on every interaction, so a long generation
+running inside the script freezes the UI. Each user turn is wrapped in a
+ChatJob and handed to a shared thread pool; the app polls the job from a
+fragment and commits the result to session state once it has finished.
+
+Nothing in this module touches `st.*` - worker threads have no script run
+context, so warnings and errors are recorded on the job instead.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import httpx
+from anthropic import Anthropic
+
+import telemetry
+
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 8000
+MAX_RETRIES = 3
+RETRY_DELAY = 3
+MAX_WORKERS = int(os.environ.get("CREWAI_DEBUGGER_WORKERS", "8"))
+PREFETCH_WORKERS = int(os.environ.get("CREWAI_DEBUGGER_PREFETCH_WORKERS", "2"))
+MAP_CONCURRENCY = int(os.environ.get("CREWAI_DEBUGGER_MAP_CONCURRENCY", "4"))
+
+# Shared by every session in this process; imported modules survive reruns
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="crewai-debugger")
+# Speculative requests get their own small pool so they never delay a real turn
+_prefetch_executor = ThreadPoolExecutor(max_workers=max(PREFETCH_WORKERS, 1),
+                                        thread_name_prefix="crewai-debugger-prefetch")
+# Per-chunk requests of map-reduce analyses, capped process-wide
+_map_executor = ThreadPoolExecutor(max_workers=max(MAP_CONCURRENCY, 1), thread_name_prefix="crewai-debugger-map")
+
+
+class ChatJob:
+    """A single user turn dispatched to the background worker"""
+
+    def __init__(self, user_message, initial=False):
+        self.user_message = user_message
+        self.initial = initial
+        self.status = "queued"
+        self.partial = ""
+        self.notices = []
+        self.error = None
+        self.usage = None
+        self.cache_key = None
+        self.sent_content = None
+        # Set for follow-ups the app sends on its own, e.g. patch corrections
+        self.auto = False
+        # Set for predicted follow-ups prefetched before the user asks them
+        self.speculative = False
+        self.history_length = 0
+        self.correction_round = 0
+        self.max_tokens = MAX_TOKENS
+        # Map-reduce progress, one {'name', 'status'} per chunk, and the per-chunk jobs
+        self.chunks = None
+        self.children = []
+        self.created_at = datetime.now().isoformat()
+        self.cancel_event = threading.Event()
+        self.future = None
+        self._stream = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "cancelled", "error")
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Stop the job, closing the upstream stream if one is open"""
+        self.cancel_event.set()
+        if self.status == "queued":
+            self.status = "cancelled"
+        for child in self.children:
+            child.cancel()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+def create_client(api_key):
+    """Create an Anthropic client with a custom HTTP client"""
+    # Custom HTTP client with longer timeouts and retry configuration
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(120.0, connect=60.0),
+        limits=httpx.Limits(max_keepalive_connections=5, max_connections=10),
+        follow_redirects=True,
+        verify=True
+    )
+    client = Anthropic(
+        api_key=api_key,
+        http_client=http_client,
+        max_retries=2
+    )
+    return client, http_client
+
+
+def _retry(job, branch, notice):
+    """Record a retry notice and wait; returns False if the job was cancelled meanwhile"""
+    telemetry.incr("retries_total", branch=branch)
+    job.notices.append(notice)
+    job.status = "retrying"
+    job.partial = ""
+    return not job.cancel_event.wait(RETRY_DELAY)
+
+
+def _record_usage(job, stream):
+    """Copy token usage from the stream snapshot onto the job and into the counters"""
+    try:
+        usage = stream.current_message_snapshot.usage
+    except Exception:
+        return
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    job.usage = {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_read_input_tokens": cache_read,
+    }
+    telemetry.incr("tokens_total", usage.input_tokens, kind="input")
+    telemetry.incr("tokens_total", usage.output_tokens, kind="output")
+    if cache_read:
+        telemetry.incr("tokens_total", cache_read, kind="cache_read")
+        telemetry.incr("cache_hits_total", cache="prompt")
+
+
+def _with_cache_breakpoints(system_prompt, messages):
+    """Mark the system prompt, the file context and the latest answer as cacheable prefixes
+
+    Follow-ups (and prefetched follow-ups) share everything up to the new
+    user turn, so they read these prefixes from the prompt cache.
+    """
+    system = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    marked = [dict(message) for message in messages]
+    for index in {0, len(marked) - 2} if len(marked) > 2 else {0}:
+        content = marked[index]["content"]
+        if isinstance(content, str):
+            marked[index]["content"] = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+    return system, marked
+
+
+def run_job(job, api_key, system_prompt, messages):
+    """Stream a response for `job`, retrying transient failures"""
+    telemetry.incr("requests_total", initial=job.initial, speculative=job.speculative)
+    with telemetry.span("api.request", initial=job.initial, speculative=job.speculative) as request_span:
+        _run_attempts(job, api_key, system_prompt, messages)
+        request_span.set(status=job.status)
+    telemetry.incr("responses_total", status=job.status)
+    return job
+
+
+def _run_attempts(job, api_key, system_prompt, messages):
+    system, messages = _with_cache_breakpoints(system_prompt, messages)
+    for attempt in range(MAX_RETRIES):
+        if job.cancelled:
+            job.status = "cancelled"
+            return job
+
+        http_client = None
+        try:
+            job.status = "running"
+            with telemetry.span("api.client"):
+                client, http_client = create_client(api_key)
+
+            with telemetry.span("api.call", attempt=attempt + 1) as call_span:
+                with client.messages.stream(
+                    model=MODEL,
+                    max_tokens=job.max_tokens,
+                    system=system,
+                    messages=messages
+                ) as stream:
+                    job._stream = stream
+                    call_span.mark("connect")
+                    for text in stream.text_stream:
+                        if job.cancelled:
+                            break
+                        if not job.partial:
+                            call_span.mark("first_byte")
+                        job.partial += text
+                    call_span.mark("complete")
+                    _record_usage(job, stream)
+
+            job.status = "cancelled" if job.cancelled else "done"
+            return job
+
+        except httpx.ConnectTimeout:
+            if job.cancelled:
+                job.status = "cancelled"
+                return job
+            telemetry.incr("errors_total", branch="connect_timeout")
+            if attempt < MAX_RETRIES - 1:
+                if _retry(job, "connect_timeout", f"⏱️ Connection timeout on attempt {attempt + 1}. Retrying in {RETRY_DELAY} seconds..."):
+                    continue
+                job.status = "cancelled"
+                return job
+            job.error = "❌ Connection Timeout: The request took too long to connect. This might be a Streamlit Cloud network restriction. Please try:\n\n1. Refresh the page and try again\n2. Check if Anthropic API is accessible from your region\n3. Contact Streamlit support about API access restrictions"
+
+        except httpx.ReadTimeout:
+            if job.cancelled:
+                job.status = "cancelled"
+                return job
+            telemetry.incr("errors_total", branch="read_timeout")
+            if attempt < MAX_RETRIES - 1:
+                if _retry(job, "read_timeout", f"⏱️ Read timeout on attempt {attempt + 1}. Retrying in {RETRY_DELAY} seconds..."):
+                    continue
+                job.status = "cancelled"
+                return job
+            job.error = "❌ Read Timeout: The API took too long to respond. Your files might be too large. Try:\n\n1. Reducing file sizes\n2. Removing the error log temporarily\n3. Trying again in a moment"
+
+        except httpx.ConnectError as e:
+            if job.cancelled:
+                job.status = "cancelled"
+                return job
+            telemetry.incr("errors_total", branch="connect_error")
+            if attempt < MAX_RETRIES - 1:
+                if _retry(job, "connect_error", f"🔌 Network error on attempt {attempt + 1}. Retrying in {RETRY_DELAY} seconds..."):
+                    continue
+                job.status = "cancelled"
+                return job
+            job.error = f"❌ Network Connection Failed: Cannot reach Anthropic API.\n\n**This is likely a Streamlit Cloud limitation.**\n\nWorkarounds:\n1. Deploy on a different platform (Hugging Face Spaces, Render, Railway)\n2. Run locally: `streamlit run streamlit_app.py`\n3. Use a proxy service\n\nTechnical details: {str(e)}"
+
+        except Exception as e:
+            # Closing the stream from the UI thread surfaces here as a read error
+            if job.cancelled:
+                job.status = "cancelled"
+                return job
+            error_type = type(e).__name__
+            telemetry.incr("errors_total", branch="other", error=error_type)
+            if "Authentication" in error_type or "401" in str(e):
+                job.error = "❌ Authentication Error: Invalid API key. Please verify your ANTHROPIC_API_KEY in secrets."
+            elif "RateLimit" in error_type or "429" in str(e):
+                job.error = "❌ Rate Limit: Too many requests. Please wait a moment and try again."
+            elif attempt < MAX_RETRIES - 1:
+                if _retry(job, "other", f"⚠️ Error on attempt {attempt + 1}: {error_type}. Retrying..."):
+                    continue
+                job.status = "cancelled"
+                return job
+            else:
+                job.error = f"❌ Error: {error_type}: {str(e)}\n\nIf this persists, Streamlit Cloud may be blocking external API calls. Consider running locally or deploying elsewhere."
+
+        finally:
+            job._stream = None
+            if http_client is not None:
+                http_client.close()
+
+        job.status = "error"
+        return job
+
+    job.status = "error"
+    return job
+
+
+def run_map_reduce(job, api_key, system_prompt, map_requests, reduce, map_max_tokens):
+    """Analyze chunks concurrently, then stream the merged answer for `job`
+
+    `map_requests` is a list of (chunk name, messages); `reduce(findings)`
+    builds the final messages from the per-chunk answers (None for chunks
+    that failed). Progress is kept in `job.chunks` for the UI.
+    """
+    job.status = "running"
+    job.chunks = [{"name": name, "status": "queued"} for name, _ in map_requests]
+    telemetry.incr("map_reduce_total")
+    with telemetry.span("api.map_reduce", chunks=len(map_requests)) as map_span:
+        children = []
+        for name, messages in map_requests:
+            child = ChatJob(name)
+            child.max_tokens = map_max_tokens
+            child.future = _map_executor.submit(run_job, child, api_key, system_prompt, messages)
+            children.append(child)
+        job.children = children
+
+        while True:
+            for progress, child in zip(job.chunks, children):
+                progress["status"] = child.status
+            if all(child.finished for child in children) or job.cancelled:
+                break
+            job.cancel_event.wait(0.2)
+        map_span.set(failed=sum(child.status != "done" for child in children))
+
+    if job.cancelled:
+        # Children submitted before job.children was set are not reached by job.cancel()
+        for child in children:
+            child.cancel()
+        job.status = "cancelled"
+        return job
+    findings = [child.partial if child.status == "done" else None for child in children]
+    if not any(finding is not None for finding in findings):
+        job.error = next((child.error for child in children if child.error), None) \
+            or "❌ Error: none of the chunks could be analyzed."
+        job.status = "error"
+        return job
+
+    messages = reduce(findings)
+    job.sent_content = messages[-1]["content"]
+    return run_job(job, api_key, system_prompt, messages)
+
+
+def submit_map_reduce(job, api_key, system_prompt, map_requests, reduce, map_max_tokens):
+    """Queue a map-reduce analysis for `job`; the chunks run on the capped map pool"""
+    job.future = _executor.submit(run_map_reduce, job, api_key, system_prompt, map_requests, reduce, map_max_tokens)
+    return job
+
+
+def submit(job, api_key, system_prompt, messages):
+    """Queue `job` on the shared worker pool (speculative jobs on the low-priority pool)"""
+    executor = _prefetch_executor if job.speculative else _executor
+    job.future = executor.submit(run_job, job, api_key, system_prompt, messages)
+    return job
@@ -0,0 +1,274 @@
+"""Token-minimizing encoder for uploaded CrewAI files.
+
+Large tools.py and crew.py files carry license banners, comment blocks,
+long docstrings and runs of blank lines that cost input tokens on every
+request. The encoder removes them while keeping what the model needs:
+
+- Python: comments go (except TODO/FIXME/noqa/type: markers), the module
+  docstring goes, other docstrings shrink to their summary line. Docstrings
+  of @tool functions and BaseTool subclasses are kept whole because CrewAI
+  sends them to the LLM as tool descriptions.
+- YAML: comments and blank lines outside block scalars go and `key:   value`
+  spacing is normalized.
+
+Wherever lines are dropped, a `#@N` line is inserted meaning "the next line
+is line N of the original file", so line references in the model's answers
+still point at the uploaded files. Every encoding is checked - the Python
+AST (ignoring docstrings) or the loaded YAML document must be unchanged - and
+a file that fails the check, or does not parse in the first place, is sent
+verbatim since its exact text is what needs debugging.
+"""
+import ast
+import io
+import re
+import tokenize
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - PyYAML is in requirements.txt
+    yaml = None
+
+_YAML_LOADER = getattr(yaml, "CSafeLoader", None) or getattr(yaml, "SafeLoader", None)
+
+MARKER_PREFIX = "#@"
+CONTEXT_NOTE = (
+    "Files marked (compacted) had comments, blank-line runs and non-essential docstrings removed "
+    "to save tokens. A line `#@N` means the next line is line N of the original file, and the "
+    "lines after it continue consecutively. Always cite original line numbers.\n\n"
+)
+
+_KEEP_COMMENT_RE = re.compile(r'#\s*(TODO|FIXME|XXX|HACK|BUG|noqa|type:|pragma)', re.IGNORECASE)
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]|\n')
+_YAML_BLOCK_RE = re.compile(r'(:|^\s*-)\s+[|>][-+0-9]*\s*(#.*)?$|:[|>][-+0-9]*\s*(#.*)?$')
+_YAML_KEY_SPACING_RE = re.compile(r'^(\s*(?:- )?[\w.\-"\']+):[ \t]{2,}(?=\S)')
+
+
+def estimate_tokens(text):
+    """Rough BPE token count - words, punctuation and newlines each count as one"""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _emit(lines, kept):
+    """Join kept lines, inserting `#@N` markers after every gap; returns (text, line_map)"""
+    output = []
+    line_map = []
+    gap = False
+    for number, line in enumerate(lines, start=1):
+        text = kept.get(number)
+        if text is None:
+            gap = True
+            continue
+        if gap:
+            output.append(f"{MARKER_PREFIX}{number}")
+            line_map.append(None)
+            gap = False
+        output.append(text)
+        line_map.append(number)
+    return "\n".join(output), line_map
+
+
+def _collapse_blank_runs(lines, kept, protected):
+    """Drop blank lines where that doesn't cost an extra `#@N` marker, leaving protected lines alone
+
+    A blank run next to removed lines joins that gap for free; an isolated
+    run is only worth collapsing once it is long enough to pay for a marker.
+    """
+    number = 1
+    total = len(lines)
+    while number <= total:
+        text = kept.get(number)
+        if text is None or text.strip() or number in protected:
+            number += 1
+            continue
+        end = number
+        while end + 1 <= total and kept.get(end + 1) is not None \
+                and not kept[end + 1].strip() and end + 1 not in protected:
+            end += 1
+        touches_gap = (number > 1 and kept.get(number - 1) is None) or (end < total and kept.get(end + 1) is None)
+        if touches_gap:
+            for blank in range(number, end + 1):
+                kept[blank] = None
+        elif end - number + 1 >= 3:
+            for blank in range(number + 1, end + 1):
+                kept[blank] = None
+        number = end + 1
+
+
+def _is_tool(node):
+    """True for @tool functions and classes deriving from BaseTool"""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+            if name == "tool":
+                return True
+    if isinstance(node, ast.ClassDef):
+        for base in node.bases:
+            name = base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "")
+            if name == "BaseTool":
+                return True
+    return False
+
+
+def _docstring_node(node):
+    body = getattr(node, "body", None)
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        return body[0]
+    return None
+
+
+def _without_docstrings(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            if _docstring_node(node) is not None:
+                node.body = node.body[1:] or [ast.Pass()]
+    return ast.dump(tree)
+
+
+def encode_python(source):
+    """Compact Python source; returns (text, line_map) or None if it can't be done safely"""
+    try:
+        tree = ast.parse(source)
+        tokens = list(tokenize.generate_tokens(io.StringIO(source).readline))
+    except (SyntaxError, tokenize.TokenError, IndentationError, ValueError):
+        return None
+
+    lines = source.splitlines()
+    kept = {number: line.rstrip() for number, line in enumerate(lines, start=1)}
+
+    # Lines inside multi-line strings are never touched
+    protected = set()
+    for token in tokens:
+        if token.type == tokenize.STRING and token.end[0] > token.start[0]:
+            protected.update(range(token.start[0] + 1, token.end[0] + 1))
+
+    for token in tokens:
+        if token.type != tokenize.COMMENT or _KEEP_COMMENT_RE.match(token.string):
+            continue
+        number, column = token.start
+        if number in protected or kept.get(number) is None:
+            continue
+        remainder = lines[number - 1][:column].rstrip()
+        kept[number] = remainder if remainder else None
+
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        docstring = _docstring_node(node)
+        if docstring is None or _is_tool(node):
+            continue
+        start, end = docstring.lineno, docstring.end_lineno
+        indent = lines[start - 1][:docstring.col_offset]
+        # Docstrings sharing a line with other code are left alone
+        if indent.strip() or lines[end - 1][docstring.end_col_offset:].strip():
+            continue
+        if isinstance(node, ast.Module):
+            summary = None
+        else:
+            text = docstring.value.value.strip()
+            if start == end or len(text.splitlines()) <= 1:
+                continue
+            first_line = text.splitlines()[0].strip()
+            if '"' in first_line or "\\" in first_line:
+                summary = f"{indent}{first_line!r}"
+            else:
+                summary = f'{indent}"""{first_line}"""'
+        for number in range(start, end + 1):
+            kept[number] = None
+            protected.discard(number)
+        kept[start] = summary
+
+    _collapse_blank_runs(lines, kept, protected)
+    encoded, line_map = _emit(lines, kept)
+
+    # Guard: apart from docstrings, the program must be exactly the same
+    try:
+        if _without_docstrings(ast.parse(encoded)) != _without_docstrings(ast.parse(source)):
+            return None
+    except SyntaxError:
+        return None
+    return encoded, line_map
+
+
+def _strip_yaml_comment(line):
+    """Remove a trailing comment that sits outside quotes"""
+    quote = None
+    for index, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif char == "#" and (index == 0 or line[index - 1] in " \t"):
+            return line[:index].rstrip()
+    return line.rstrip()
+
+
+def encode_yaml(source):
+    """Compact YAML source; returns (text, line_map) or None if it can't be done safely
+
+    This is not full canonicalization: only comments and blank lines outside
+    block scalars are removed and `key:   value` spacing is normalized. Quoting,
+    flow style, key order and indentation are left as written.
+    """
+    if yaml is None:
+        return None
+    try:
+        original = yaml.load(source, Loader=_YAML_LOADER)
+    except yaml.YAMLError:
+        return None
+
+    lines = source.splitlines()
+    kept = {}
+    protected = set()
+    block_indent = None
+    for number, line in enumerate(lines, start=1):
+        indent = len(line) - len(line.lstrip())
+        if block_indent is not None:
+            if not line.strip() or indent > block_indent:
+                kept[number] = line.rstrip()
+                protected.add(number)
+                continue
+            block_indent = None
+
+        stripped = _strip_yaml_comment(line)
+        if not stripped.strip():
+            kept[number] = None
+            continue
+        kept[number] = _YAML_KEY_SPACING_RE.sub(r"\1: ", stripped)
+        if _YAML_BLOCK_RE.search(line):
+            block_indent = indent
+
+    encoded, line_map = _emit(lines, kept)
+    try:
+        if yaml.load(encoded, Loader=_YAML_LOADER) != original:
+            return None
+    except yaml.YAMLError:
+        return None
+    return encoded, line_map
+
+
+def encode_file(source, language):
+    """Encode one file; always returns a report dict, with `encoded` False when sent verbatim
+
+    `line_map` gives the original line number of each encoded line (None for
+    `#@N` markers); patches uses it to replay diffs written against the
+    compacted text onto the uploaded file.
+    """
+    result = encode_python(source) if language == "python" else encode_yaml(source)
+    if result is None or estimate_tokens(result[0]) >= estimate_tokens(source):
+        text, line_map, encoded = source, list(range(1, len(source.splitlines()) + 1)), False
+    else:
+        (text, line_map), encoded = result, True
+    original_tokens = estimate_tokens(source)
+    encoded_tokens = estimate_tokens(text)
+    return {
+        "text": text,
+        "line_map": line_map,
+        "encoded": encoded,
+        "original_tokens": original_tokens,
+        "encoded_tokens": encoded_tokens,
+        "saved_tokens": original_tokens - encoded_tokens,
+    }
+
@@ -0,0 +1,279 @@
+"""Static estimate of the LLM calls, tokens and time a crew run will take.
+
+Works from the uploaded agents.yaml, tasks.yaml and crew.py alone, in a few
+milliseconds, before anyone runs `crew.kickoff()`. Each task gets a typical
+and a worst-case bound:
+
+- calls: one per agent iteration. Typically one final answer plus a couple
+  of tool rounds; at worst `max_iter` iterations, multiplied by the
+  coworker's loop when `allow_delegation` lets every iteration delegate,
+  and by the manager's loop in a hierarchical process
+- input tokens: the agent prompt (role, goal, backstory, tool descriptions,
+  CrewAI's ReAct template), the task text and the outputs of context tasks,
+  re-sent on every iteration with the scratchpad growing each round
+- time: per-call latency plus generation and tool time, floored by
+  `max_rpm` when it is set
+
+The constants are deliberately round numbers - the aim is to spot
+configurations that can blow up by orders of magnitude, not to bill.
+"""
+import crew_checks
+from context_encoder import estimate_tokens
+
+DEFAULT_MAX_ITER = 20              # CrewAI's default Agent.max_iter
+FRAMEWORK_PROMPT_TOKENS = 400      # ReAct instructions CrewAI wraps around every prompt
+TOOL_PROMPT_TOKENS = 150           # name, description and argument schema per tool
+TYPICAL_TOOL_ROUNDS = 2
+OUTPUT_TOKENS = (600, 4000)        # (typical, worst) size of a task's final answer
+STEP_OUTPUT_TOKENS = (150, 500)    # thought + action per intermediate iteration
+TOOL_RESULT_TOKENS = (500, 2000)   # scratchpad growth per tool round
+SECONDS_PER_CALL = 1.5
+TOKENS_PER_SECOND = 50
+TOOL_SECONDS = (2, 10)
+MANAGER_ITERATIONS = 3             # delegate, review, answer
+
+WORST_CALLS_PER_TASK = 50
+WORST_CALLS_PER_RUN = 200
+CONTEXT_WINDOW_TOKENS = 100000
+WORST_INPUT_TOKENS_PER_RUN = 1000000
+MANY_TOOLS = 10
+# Flags of one kind are merged into a single line naming at most this many tasks or agents
+MAX_FLAG_ITEMS = 5
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1")
+    return bool(value)
+
+
+def _as_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _loop(iterations, base_tokens, result_tokens, step_tokens, final_tokens):
+    """Calls and tokens for one agent loop whose prompt grows by a tool result each iteration"""
+    input_tokens = iterations * base_tokens + result_tokens * iterations * (iterations - 1) // 2
+    output_tokens = (iterations - 1) * step_tokens + final_tokens
+    largest_prompt = base_tokens + result_tokens * (iterations - 1)
+    return iterations, input_tokens, output_tokens, largest_prompt
+
+
+def _seconds(calls, output_tokens, tool_rounds, tool_seconds):
+    return calls * SECONDS_PER_CALL + output_tokens / TOKENS_PER_SECOND + tool_rounds * tool_seconds
+
+
+def _agent_profiles(agents, settings):
+    profiles = {}
+    for name, config in agents.items():
+        config = config if isinstance(config, dict) else {}
+        code = settings.get(name, {})
+        tools = code.get("tools", config.get("tools"))
+        if isinstance(tools, list):
+            tools = len(tools)
+        prompt = " ".join(str(config.get(key, "")) for key in ("role", "goal", "backstory"))
+        profiles[name] = {
+            "tools": tools if isinstance(tools, int) else (1 if tools else 0),
+            "max_iter": _as_int(code.get("max_iter", config.get("max_iter")), DEFAULT_MAX_ITER),
+            "max_iter_set": "max_iter" in code or "max_iter" in config,
+            "allow_delegation": _as_bool(code.get("allow_delegation", config.get("allow_delegation", False))),
+            "prompt_tokens": estimate_tokens(prompt) + FRAMEWORK_PROMPT_TOKENS,
+        }
+    return profiles
+
+
+def _group_flags(items, summary):
+    """One flag per item, or a single `summary` flag naming the worst MAX_FLAG_ITEMS when there are several"""
+    if len(items) <= 1:
+        return [message for _, message, _ in items]
+    worst = sorted(items, key=lambda item: item[0], reverse=True)
+    names = ", ".join(label for _, _, label in worst[:MAX_FLAG_ITEMS])
+    more = f" and {len(items) - MAX_FLAG_ITEMS} more" if len(items) > MAX_FLAG_ITEMS else ""
+    return [f"{summary}: {names}{more}"]
+
+
+def estimate_crew(files):
+    """Estimate a run of the uploaded crew; returns a dict with per-task bounds, totals and flags"""
+    agents = crew_checks.load_yaml(files.get("agents")) or {}
+    tasks = crew_checks.load_yaml(files.get("tasks")) or {}
+    settings = crew_checks.parse_crew_settings(files.get("crew"))
+    crew = settings["crew"]
+    hierarchical = str(crew.get("process", "sequential")).lower() == "hierarchical"
+    profiles = _agent_profiles(agents, settings["agents"])
+    flags = []
+    # kind -> [(severity, single-item message, item label)], merged into one flag per kind below
+    grouped = {}
+
+    if hierarchical and not (crew.get("manager_llm") or crew.get("manager_agent")):
+        flags.append("Hierarchical process without manager_llm or manager_agent - CrewAI refuses to start this crew")
+    manager_iter = DEFAULT_MAX_ITER
+    default_agent = {"tools": 0, "max_iter": DEFAULT_MAX_ITER, "max_iter_set": False,
+                     "allow_delegation": False, "prompt_tokens": FRAMEWORK_PROMPT_TOKENS}
+
+    results = []
+    previous = []
+    for name, config in tasks.items():
+        if not isinstance(config, dict):
+            continue
+        code = settings["tasks"].get(name, {})
+        agent_name = code.get("agent") or config.get("agent")
+        agent = profiles.get(agent_name, default_agent)
+        tools = code.get("tools", config.get("tools"))
+        tool_count = (len(tools) if isinstance(tools, list) else tools) if tools is not None else agent["tools"]
+        tool_count = tool_count if isinstance(tool_count, int) else 1
+        task_tokens = estimate_tokens(f"{config.get('description', '')} {config.get('expected_output', '')}")
+
+        context = code.get("context", config.get("context"))
+        if context is None:
+            # Without an explicit context CrewAI passes only the output of the task just before
+            context_tasks = previous[-1:]
+        else:
+            context_tasks = context if isinstance(context, list) else [context]
+        base = agent["prompt_tokens"] + tool_count * TOOL_PROMPT_TOKENS + task_tokens
+
+        typical_iter = 1 + (TYPICAL_TOOL_ROUNDS if tool_count else 0)
+        worst_iter = agent["max_iter"] if tool_count or agent["allow_delegation"] else 1
+        typical = _loop(typical_iter, base + len(context_tasks) * OUTPUT_TOKENS[0],
+                        TOOL_RESULT_TOKENS[0], STEP_OUTPUT_TOKENS[0], OUTPUT_TOKENS[0])
+        worst = _loop(worst_iter, base + len(context_tasks) * OUTPUT_TOKENS[1],
+                      TOOL_RESULT_TOKENS[1], STEP_OUTPUT_TOKENS[1], OUTPUT_TOKENS[1])
+        worst_calls, worst_input, worst_output, worst_prompt = worst
+        typical_calls, typical_input, typical_output, typical_prompt = typical
+        notes = []
+
+        coworkers = [profile for other, profile in profiles.items() if other != agent_name]
+        if agent["allow_delegation"] and coworkers and not hierarchical:
+            # Every iteration may hand work to a coworker that runs its own loop
+            coworker = max(coworkers, key=lambda profile: profile["max_iter"] if profile["tools"] else 1)
+            coworker_iter = coworker["max_iter"] if coworker["tools"] else 1
+            delegated = _loop(coworker_iter, coworker["prompt_tokens"] + coworker["tools"] * TOOL_PROMPT_TOKENS
+                              + task_tokens, TOOL_RESULT_TOKENS[1], STEP_OUTPUT_TOKENS[1], OUTPUT_TOKENS[1])
+            worst_calls += worst_iter * delegated[0]
+            worst_input += worst_iter * delegated[1]
+            worst_output += worst_iter * delegated[2]
+            notes.append(f"delegation: up to {worst_iter} x {coworker_iter} coworker calls")
+        if hierarchical:
+            # The manager runs the task and delegates; each delegation is a full worker loop
+            typical_calls += MANAGER_ITERATIONS
+            typical_input += MANAGER_ITERATIONS * typical_prompt
+            typical_output += MANAGER_ITERATIONS * STEP_OUTPUT_TOKENS[0]
+            worst_calls = manager_iter * (worst_calls + 1)
+            worst_input = manager_iter * (worst_input + worst_prompt)
+            worst_output = manager_iter * (worst_output + STEP_OUTPUT_TOKENS[1])
+            notes.append(f"manager: {MANAGER_ITERATIONS} typical, up to {manager_iter} delegation rounds")
+        if not agent["max_iter_set"] and worst_iter > 1:
+            notes.append(f"max_iter not set, CrewAI default {DEFAULT_MAX_ITER}")
+        if context_tasks:
+            notes.append(f"context from {len(context_tasks)} task(s)")
+
+        typical_tool_rounds = typical_iter - 1
+        results.append({
+            "name": name,
+            "agent": agent_name,
+            "tools": tool_count,
+            "context": context_tasks,
+            "explicit_context": context is not None,
+            "async_execution": _as_bool(code.get("async_execution", config.get("async_execution", False))),
+            "calls": (typical_calls, worst_calls),
+            "input_tokens": (typical_input, worst_input),
+            "output_tokens": (typical_output, worst_output),
+            "largest_prompt": (typical_prompt, worst_prompt),
+            "seconds": (_seconds(typical_calls, typical_output, typical_tool_rounds, TOOL_SECONDS[0]),
+                        _seconds(worst_calls, worst_output, worst_calls - 1 if tool_count else 0, TOOL_SECONDS[1])),
+            "notes": notes,
+        })
+        previous.append(name)
+
+        if worst_calls >= WORST_CALLS_PER_TASK:
+            grouped.setdefault("calls", []).append((
+                worst_calls, f"Task '{name}' can make up to {worst_calls:,} LLM calls ({'; '.join(notes)})",
+                f"'{name}' ({worst_calls:,})"))
+        if worst_prompt >= CONTEXT_WINDOW_TOKENS:
+            grouped.setdefault("overflow", []).append((
+                worst_prompt, f"Task '{name}' prompts can grow to ~{worst_prompt:,} tokens and may overflow the context window",
+                f"'{name}' (~{worst_prompt:,})"))
+        elif context is None and len(previous) >= 3:
+            # `previous` already includes this task; the outputs before its predecessor are not passed
+            unseen = len(previous) - 2
+            grouped.setdefault("implicit", []).append((
+                unseen, f"Task '{name}' has no explicit context, so it only gets the previous task's output and not "
+                        f"the {unseen} before it - list the tasks it needs",
+                f"'{name}' ({unseen})"))
+
+    for name, profile in profiles.items():
+        if profile["max_iter"] > 25:
+            grouped.setdefault("max_iter", []).append((
+                profile["max_iter"], f"Agent '{name}' has max_iter={profile['max_iter']}, so a stuck tool loop runs that long",
+                f"'{name}' ({profile['max_iter']})"))
+        if profile["tools"] > MANY_TOOLS:
+            grouped.setdefault("tools", []).append((
+                profile["tools"], f"Agent '{name}' has {profile['tools']} tools - every prompt carries all their descriptions",
+                f"'{name}' ({profile['tools']})"))
+        if profile["allow_delegation"] and hierarchical:
+            grouped.setdefault("delegation", []).append((
+                0, f"Agent '{name}' allows delegation inside a hierarchical crew - delegation loops can nest", f"'{name}'"))
+
+    for kind, summary in (
+        ("calls", "{count} tasks can make {limit:,}+ LLM calls each (worst case)"),
+        ("overflow", "{count} tasks have prompts that can overflow the context window (worst-case tokens)"),
+        ("implicit", "{count} tasks have no explicit context, so each only gets the previous task's output - "
+                     "list the tasks each needs (earlier outputs not passed)"),
+        ("max_iter", "{count} agents have max_iter above 25, so a stuck tool loop runs that long"),
+        ("tools", "{count} agents have more than {tools} tools - every prompt carries all their descriptions"),
+        ("delegation", "{count} agents allow delegation inside a hierarchical crew - delegation loops can nest"),
+    ):
+        flags.extend(_group_flags(grouped.get(kind, []), summary.format(
+            count=len(grouped.get(kind, [])), limit=WORST_CALLS_PER_TASK, tools=MANY_TOOLS)))
+
+    totals = {
+        key: tuple(sum(result[key][bound] for result in results) for bound in (0, 1))
+        for key in ("calls", "input_tokens", "output_tokens", "seconds")
+    }
+    if _as_bool(crew.get("planning")):
+        planning_tokens = sum(result["largest_prompt"][0] for result in results) // 2
+        totals["calls"] = (totals["calls"][0] + 1, totals["calls"][1] + 1)
+        totals["input_tokens"] = (totals["input_tokens"][0] + planning_tokens, totals["input_tokens"][1] + planning_tokens)
+        totals["output_tokens"] = (totals["output_tokens"][0] + OUTPUT_TOKENS[0], totals["output_tokens"][1] + OUTPUT_TOKENS[1])
+    if _as_bool(crew.get("memory")):
+        flags.append("memory=True adds embedding and memory-extraction calls per task that are not counted here")
+    max_rpm = _as_int(crew.get("max_rpm"), 0)
+    if max_rpm > 0:
+        # The rate limiter caps throughput whatever the model latency
+        totals["seconds"] = tuple(max(seconds, calls * 60 / max_rpm)
+                                  for seconds, calls in zip(totals["seconds"], totals["calls"]))
+    if totals["calls"][1] >= WORST_CALLS_PER_RUN:
+        flags.append(f"Worst case for the whole run is {totals['calls'][1]:,} LLM calls")
+    if totals["input_tokens"][1] >= WORST_INPUT_TOKENS_PER_RUN:
+        flags.append(f"Worst case for the whole run is ~{totals['input_tokens'][1]:,} input tokens")
+
+    return {"process": "hierarchical" if hierarchical else "sequential", "tasks": results,
+            "totals": totals, "flags": flags}
+
+
+def _range(bounds, unit=""):
+    return f"{bounds[0]:,.0f}-{bounds[1]:,.0f}{unit}"
+
+
+def compact_summary(estimate, max_tasks=30):
+    """Short markdown digest of the estimate for the model context; lists the costliest `max_tasks` tasks"""
+    totals = estimate["totals"]
+    lines = [
+        f"Computed locally from the YAML and crew.py ({estimate['process']} process). Typical-worst bounds per run: "
+        f"{_range(totals['calls'])} LLM calls, {_range(totals['input_tokens'])} input tokens, "
+        f"{_range(totals['output_tokens'])} output tokens, {_range(totals['seconds'], 's')}.",
+    ]
+    ranked = sorted(estimate["tasks"], key=lambda result: result["input_tokens"][1], reverse=True)
+    costliest = {result["name"] for result in ranked[:max_tasks]}
+    for result in (result for result in estimate["tasks"] if result["name"] in costliest):
+        notes = f" ({'; '.join(result['notes'])})" if result["notes"] else ""
+        lines.append(f"- {result['name']} [{result['agent'] or '?'}, {result['tools']} tools]: "
+                     f"{_range(result['calls'])} calls, {_range(result['input_tokens'])} input tokens{notes}")
+    if len(estimate["tasks"]) > max_tasks:
+        lines.append(f"- ... {len(estimate['tasks']) - max_tasks} cheaper task(s) not listed")
+    if estimate["flags"]:
+        lines.append("\nCost/latency risks:")
+        lines.extend(f"- {flag}" for flag in estimate["flags"])
+    return "\n".join(lines)
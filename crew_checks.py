@@ -0,0 +1,229 @@
+"""Static cross-file checks for an uploaded CrewAI project.
+
+These run locally in milliseconds and catch the mismatches that most often
+break a crew at kickoff: tasks pointing at unknown agents or context tasks,
+missing required keys, and crew.py methods or config lookups that don't
+match the YAML keys.
+"""
+import ast
+import re
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - PyYAML is in requirements.txt
+    yaml = None
+
+# libyaml's loader is an order of magnitude faster on large configs when PyYAML was built with it
+_LOADER = getattr(yaml, "CSafeLoader", None) or getattr(yaml, "SafeLoader", None)
+_ISSUE_LINE_RE = re.compile(r"^([\w.]+):\d+:")
+
+REQUIRED_AGENT_KEYS = ("role", "goal", "backstory")
+REQUIRED_TASK_KEYS = ("description", "expected_output")
+
+
+def load_yaml(text):
+    """Parse YAML into a dict, or None if it is missing, invalid or not a mapping"""
+    if yaml is None or not text:
+        return None
+    try:
+        data = yaml.load(text, Loader=_LOADER)
+    except yaml.YAMLError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _decorator_names(node):
+    names = []
+    for decorator in node.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        names.append(target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", ""))
+    return names
+
+
+def parse_crew(source):
+    """Collect @agent/@task methods and agents_config/tasks_config lookups from crew.py"""
+    result = {"agent_methods": [], "task_methods": [], "agent_config_refs": [], "task_config_refs": []}
+    if not source:
+        return result
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return result
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            decorators = _decorator_names(node)
+            if "agent" in decorators:
+                result["agent_methods"].append((node.name, node.lineno))
+            if "task" in decorators:
+                result["task_methods"].append((node.name, node.lineno))
+        elif isinstance(node, ast.Subscript) and isinstance(node.value, ast.Attribute):
+            key = node.slice
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                if node.value.attr == "agents_config":
+                    result["agent_config_refs"].append((key.value, node.lineno))
+                elif node.value.attr == "tasks_config":
+                    result["task_config_refs"].append((key.value, node.lineno))
+    return result
+
+
+def _literal(node):
+    """Python value of a literal keyword argument, a count for lists, or a name for anything else"""
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        pass
+    if isinstance(node, ast.Attribute):
+        # Process.hierarchical -> "hierarchical"
+        return node.attr
+    return ast.unparse(node)
+
+
+def _called_methods(node):
+    """Method names in a list like [self.research_task(), self.other_task()]"""
+    names = []
+    if isinstance(node, (ast.List, ast.Tuple)):
+        for item in node.elts:
+            if isinstance(item, ast.Call) and isinstance(item.func, ast.Attribute):
+                names.append(item.func.attr)
+    return names
+
+
+def _config_key(call, attribute):
+    for keyword in call.keywords:
+        value = keyword.value
+        if keyword.arg == "config" and isinstance(value, ast.Subscript) and isinstance(value.value, ast.Attribute) \
+                and value.value.attr == attribute and isinstance(value.slice, ast.Constant):
+            return value.slice.value
+    return None
+
+
+def _first_call(node, names):
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            target = child.func
+            name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+            if name in names:
+                return child
+    return None
+
+
+def parse_crew_settings(source):
+    """Keyword settings of the Agent, Task and Crew calls in crew.py
+
+    Returns {'agents': {key: settings}, 'tasks': {key: settings}, 'crew': settings}
+    keyed by the YAML config key (or the method name when no config is used).
+    List arguments are summarized: `tools` becomes a count and `context` the
+    names of the task methods it calls; `agent=self.x()` becomes 'x'.
+    """
+    result = {"agents": {}, "tasks": {}, "crew": {}}
+    if not source:
+        return result
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return result
+
+    methods = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        decorators = _decorator_names(node)
+        for kind, call_name, attribute in (("agents", "Agent", "agents_config"), ("tasks", "Task", "tasks_config")):
+            if kind[:-1] not in decorators:
+                continue
+            call = _first_call(node, {call_name})
+            key = (_config_key(call, attribute) if call else None) or node.name
+            settings = {"method": node.name, "line": node.lineno}
+            for keyword in call.keywords if call else []:
+                if keyword.arg in (None, "config"):
+                    continue
+                if keyword.arg == "tools":
+                    value = keyword.value
+                    settings["tools"] = len(value.elts) if isinstance(value, (ast.List, ast.Tuple)) else None
+                elif keyword.arg == "context":
+                    settings["context"] = _called_methods(keyword.value)
+                elif keyword.arg == "agent" and isinstance(keyword.value, ast.Call) \
+                        and isinstance(keyword.value.func, ast.Attribute):
+                    settings["agent"] = keyword.value.func.attr
+                else:
+                    settings[keyword.arg] = _literal(keyword.value)
+            result[kind][key] = settings
+            methods[node.name] = key
+        if "crew" in decorators:
+            call = _first_call(node, {"Crew"})
+            for keyword in call.keywords if call else []:
+                if keyword.arg is not None and keyword.arg not in ("agents", "tasks"):
+                    result["crew"][keyword.arg] = _literal(keyword.value)
+
+    if not result["crew"]:
+        # Crews built without @CrewBase still usually call Crew(...) somewhere
+        call = _first_call(tree, {"Crew"})
+        for keyword in call.keywords if call else []:
+            if keyword.arg is not None and keyword.arg not in ("agents", "tasks"):
+                result["crew"][keyword.arg] = _literal(keyword.value)
+
+    # Method names used in context=[self.x()] and agent=self.y() -> config keys
+    for settings in result["tasks"].values():
+        if "context" in settings:
+            settings["context"] = [methods.get(name, name) for name in settings["context"]]
+        if "agent" in settings:
+            settings["agent"] = methods.get(settings["agent"], settings["agent"])
+    return result
+
+
+def issue_key(issue):
+    """An issue without its line number, so the same problem compares equal after lines shift"""
+    return _ISSUE_LINE_RE.sub(r"\1:", issue, count=1)
+
+
+def cross_file_checks(files):
+    """Return a list of human-readable issues found across the uploaded files"""
+    issues = []
+    agents = load_yaml(files.get("agents"))
+    tasks = load_yaml(files.get("tasks"))
+
+    if files.get("agents") and agents is None:
+        issues.append("agents.yaml: could not be parsed as a YAML mapping")
+    if files.get("tasks") and tasks is None:
+        issues.append("tasks.yaml: could not be parsed as a YAML mapping")
+
+    for name, config in (agents or {}).items():
+        if not isinstance(config, dict):
+            issues.append(f"agents.yaml: agent '{name}' is not a mapping")
+            continue
+        for key in REQUIRED_AGENT_KEYS:
+            if key not in config:
+                issues.append(f"agents.yaml: agent '{name}' is missing '{key}'")
+
+    for name, config in (tasks or {}).items():
+        if not isinstance(config, dict):
+            issues.append(f"tasks.yaml: task '{name}' is not a mapping")
+            continue
+        for key in REQUIRED_TASK_KEYS:
+            if key not in config:
+                issues.append(f"tasks.yaml: task '{name}' is missing '{key}'")
+        agent = config.get("agent")
+        if agent and agents is not None and agent not in agents:
+            issues.append(f"tasks.yaml: task '{name}' uses unknown agent '{agent}'")
+        context = config.get("context") or []
+        for dependency in context if isinstance(context, list) else [context]:
+            if tasks is not None and dependency not in tasks:
+                issues.append(f"tasks.yaml: task '{name}' has unknown context task '{dependency}'")
+
+    crew = parse_crew(files.get("crew"))
+    if agents is not None:
+        for key, line in crew["agent_config_refs"]:
+            if key not in agents:
+                issues.append(f"crew.py:{line}: agents_config['{key}'] is not defined in agents.yaml")
+        for method, line in crew["agent_methods"]:
+            if method not in agents and not crew["agent_config_refs"]:
+                issues.append(f"crew.py:{line}: @agent method '{method}' has no matching key in agents.yaml")
+    if tasks is not None:
+        for key, line in crew["task_config_refs"]:
+            if key not in tasks:
+                issues.append(f"crew.py:{line}: tasks_config['{key}'] is not defined in tasks.yaml")
+        for method, line in crew["task_methods"]:
+            if method not in tasks and not crew["task_config_refs"]:
+                issues.append(f"crew.py:{line}: @task method '{method}' has no matching key in tasks.yaml")
+    return issues
@@ -0,0 +1,220 @@
+"""Traceback fingerprints and a local store of past diagnoses.
+
+The same CrewAI failures come back again and again (missing expected_output,
+agent key mismatches, tool validation errors, LLM auth errors). A pasted error
+log is reduced to a fingerprint - exception type, normalized message and the
+frames that live in user code - and looked up in a small SQLite database so a
+prior diagnosis can be shown while the full analysis is still running.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+KB_PATH = os.environ.get(
+    "CREWAI_DEBUGGER_KB",
+    os.path.join(os.path.expanduser("~"), ".crewai_debugger", "knowledge.db")
+)
+
+_FRAME_RE = re.compile(r'^\s*File ["\'](?P<path>[^"\']+)["\'], line (?P<line>\d+)(?:, in (?P<func>\S+))?')
+_EXCEPTION_RE = re.compile(r'^(?P<type>[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Warning|Failure))(?::\s*(?P<message>.*))?$')
+# `warnings` output: "path:line: UserWarning: message"
+_WARNING_LINE_RE = re.compile(r'^\S+:\d+: \w+Warning:')
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "/lib/python", "\\lib\\python", "<frozen", "<string>")
+
+# Order matters: paths and addresses before bare numbers
+_NORMALIZERS = [
+    (re.compile(r'0x[0-9a-fA-F]+'), '<addr>'),
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>'),
+    (re.compile(r'(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}'), '<path>'),
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'"[^"\n]*"'), '<str>'),
+    (re.compile(r"'[^'\n]*'"), '<str>'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize_message(message):
+    """Strip the volatile parts (names, paths, numbers) out of an exception message"""
+    for pattern, replacement in _NORMALIZERS:
+        message = pattern.sub(replacement, message)
+    return message.strip()
+
+
+def _is_user_frame(path):
+    return not any(marker in path for marker in _LIBRARY_MARKERS)
+
+
+def _exception_line(lines):
+    """Index of the exception that surfaced, ignoring log lines (warnings) pasted after it"""
+    # The final exception is the one that surfaced; chained tracebacks come first
+    headers = [index for index, line in enumerate(lines) if line.startswith("Traceback (most recent call last)")]
+    if headers:
+        for index in range(headers[-1] + 1, len(lines)):
+            if not lines[index][:1].isspace() and _EXCEPTION_RE.match(lines[index].strip()):
+                return index
+    warning = None
+    for index in range(len(lines) - 1, -1, -1):
+        match = _EXCEPTION_RE.match(lines[index].strip())
+        if match and not match.group("type").endswith("Warning"):
+            return index
+        if match and warning is None:
+            warning = index
+    return warning
+
+
+def _is_specific(normalized):
+    """True when a normalized message says more than its placeholders, e.g. not just `<str>`"""
+    words = re.findall(r"[A-Za-z_]{3,}", re.sub(r"<\w+>", " ", normalized))
+    return len(words) >= 2
+
+
+def fingerprint_traceback(error_log):
+    """Fingerprint the last exception in `error_log`, or return None if there is none"""
+    if not error_log or not error_log.strip():
+        return None
+
+    lines = error_log.strip().splitlines()
+
+    exc_index = _exception_line(lines)
+    if exc_index is None:
+        return None
+
+    match = _EXCEPTION_RE.match(lines[exc_index].strip())
+    exception_type = match.group("type").rsplit(".", 1)[-1]
+    message_lines = [match.group("message") or ""]
+    # Pydantic and CrewAI validation errors carry the useful part on the next lines
+    for line in lines[exc_index + 1:exc_index + 6]:
+        if not line.strip() or "For further information" in line or _WARNING_LINE_RE.match(line.strip()) \
+                or _EXCEPTION_RE.match(line.strip()):
+            break
+        message_lines.append(line.strip())
+    message = " ".join(part for part in message_lines if part)
+
+    frames = []
+    start = 0
+    for index in range(exc_index - 1, -1, -1):
+        if lines[index].startswith("Traceback (most recent call last)"):
+            start = index
+            break
+    for line in lines[start:exc_index]:
+        frame = _FRAME_RE.match(line)
+        if frame and _is_user_frame(frame.group("path")):
+            frames.append(f"{os.path.basename(frame.group('path'))}:{frame.group('func') or '?'}")
+
+    normalized = normalize_message(message)
+    loose_key = hashlib.sha1(f"{exception_type}|{normalized}".encode("utf-8")).hexdigest()
+    exact_key = hashlib.sha1(f"{exception_type}|{normalized}|{'>'.join(frames)}".encode("utf-8")).hexdigest()
+
+    return {
+        "fingerprint": exact_key,
+        "loose_key": loose_key,
+        "exception_type": exception_type,
+        "message": message,
+        "normalized_message": normalized,
+        "frames": frames,
+    }
+
+
+def _connect(path=None):
+    path = path or KB_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS diagnoses (
+            fingerprint TEXT PRIMARY KEY,
+            loose_key TEXT NOT NULL,
+            exception_type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            frames TEXT NOT NULL,
+            diagnosis TEXT NOT NULL,
+            resolved INTEGER NOT NULL DEFAULT 0,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_diagnoses_loose_key ON diagnoses (loose_key)")
+    return conn
+
+
+def lookup(fingerprint, path=None):
+    """Find a diagnosis that resolved `fingerprint`; exact frame matches win over message-only ones
+
+    Only diagnoses confirmed with "This fixed my error" are returned.
+    """
+    if fingerprint is None:
+        return None
+    try:
+        conn = _connect(path)
+    except (sqlite3.Error, OSError):
+        return None
+    try:
+        with conn:
+            row = conn.execute(
+                "SELECT * FROM diagnoses WHERE fingerprint = ? AND resolved = 1", (fingerprint["fingerprint"],)
+            ).fetchone()
+            exact = row is not None
+            if row is None:
+                # A message-only match is too weak on its own for generic messages ("KeyError: <str>"),
+                # so it also needs a shared user-code frame
+                specific = _is_specific(fingerprint["normalized_message"])
+                frames = set(fingerprint["frames"])
+                for candidate in conn.execute(
+                    "SELECT * FROM diagnoses WHERE loose_key = ? AND resolved = 1 ORDER BY updated_at DESC",
+                    (fingerprint["loose_key"],)
+                ):
+                    if specific or frames & set(candidate["frames"].splitlines()):
+                        row = candidate
+                        break
+            if row is None:
+                return None
+            conn.execute("UPDATE diagnoses SET hits = hits + 1 WHERE fingerprint = ?", (row["fingerprint"],))
+            result = dict(row)
+            result["exact"] = exact
+            return result
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def record(fingerprint, diagnosis, resolved=False, path=None):
+    """Store `diagnosis` for `fingerprint`; an unresolved diagnosis never replaces a resolved one"""
+    if fingerprint is None or not diagnosis:
+        return False
+    now = time.time()
+    try:
+        conn = _connect(path)
+    except (sqlite3.Error, OSError):
+        return False
+    try:
+        with conn:
+            conn.execute("""
+                INSERT INTO diagnoses (fingerprint, loose_key, exception_type, message, frames,
+                                       diagnosis, resolved, hits, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    diagnosis = excluded.diagnosis,
+                    resolved = excluded.resolved,
+                    updated_at = excluded.updated_at
+                WHERE excluded.resolved >= diagnoses.resolved
+            """, (
+                fingerprint["fingerprint"],
+                fingerprint["loose_key"],
+                fingerprint["exception_type"],
+                fingerprint["message"],
+                "\n".join(fingerprint["frames"]),
+                diagnosis,
+                int(resolved),
+                now,
+                now,
+            ))
+        return True
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
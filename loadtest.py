@@ -0,0 +1,281 @@
+"""Concurrent-session load test for the CrewAI debugger.
+
+Drives N simulated debugging sessions through the real app script (upload,
+initial analysis, K follow-ups) with Streamlit's AppTest harness, against a
+local fake of the Anthropic streaming API. Reports throughput, turn latency
+percentiles, rerun render time and process memory for each session count.
+
+    python loadtest.py --sessions 1,5,10,25 --follow-ups 3 --first-token 0.8
+
+AppTest cannot drive st.file_uploader, so the upload step writes the file
+contents into session state exactly as the "Start Debugging Session" handler
+does. The fragment poll is replaced by explicit reruns every --poll seconds.
+AppTest swaps in a process-global runtime for each run, so script reruns are
+serialized behind a lock; API jobs and the fake backend still run
+concurrently. This approximates a single server process, where reruns share
+the GIL, and the reported render time includes waiting for that lock.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import knowledge_base
+
+# AppTest patches process-global runtime state while a script runs
+_RUN_LOCK = threading.Lock()
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+SAMPLE_FILES = {
+    "agents": "researcher:\n  role: Senior Researcher\n  goal: Find facts about {topic}\n  backstory: Curious and thorough.\n",
+    "tasks": "research_task:\n  description: Research {topic}\n  agent: researcher\n",
+    "crew": "from crewai import Agent, Crew, Process, Task\n\n\nclass ResearchCrew:\n    def crew(self):\n        return Crew(agents=self.agents, tasks=self.tasks, process=Process.sequential)\n",
+    "main": "from crew import ResearchCrew\n\nResearchCrew().crew().kickoff(inputs={'topic': 'AI'})\n",
+}
+SAMPLE_ERROR_LOG = (
+    "Traceback (most recent call last):\n"
+    "  File \"/app/main.py\", line 3, in <module>\n"
+    "    ResearchCrew().crew().kickoff(inputs={'topic': 'AI'})\n"
+    "pydantic_core._pydantic_core.ValidationError: 1 validation error for Task\n"
+    "expected_output\n"
+    "  Field required [type=missing, input_value={'description': 'Research {topic}'}, input_type=dict]\n"
+)
+FOLLOW_UPS = [
+    "Can you give me step-by-step fixes for the top issue?",
+    "Show me the corrected tasks.yaml.",
+    "Why does the agent key need to match?",
+    "How do I add error handling to my tools?",
+]
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    """Streams a canned Messages API response with configurable latency"""
+    protocol_version = "HTTP/1.1"
+    first_token = 0.5
+    chunk_delay = 0.02
+    chunks = 40
+
+    def log_message(self, format, *args):
+        pass
+
+    def _event(self, name, data):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        input_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("connection", "close")
+        self.end_headers()
+
+        self._event("message_start", {"type": "message_start", "message": {
+            "id": "msg_loadtest", "type": "message", "role": "assistant", "content": [],
+            "model": request.get("model", "fake"), "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 1}}})
+        self._event("content_block_start", {"type": "content_block_start", "index": 0,
+                                            "content_block": {"type": "text", "text": ""}})
+        time.sleep(self.first_token)
+        for index in range(self.chunks):
+            if index:
+                time.sleep(self.chunk_delay)
+            self._event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": f"Finding {index}: check the config. "}})
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {"type": "message_delta",
+                                      "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                      "usage": {"output_tokens": self.chunks * 8}})
+        self._event("message_stop", {"type": "message_stop"})
+
+
+def start_fake_backend(first_token, chunk_delay, chunks, port=0):
+    """Start the fake API on a daemon thread and return the server"""
+    handler = type("ConfiguredHandler", (FakeAnthropicHandler,), {
+        "first_token": first_token,
+        "chunk_delay": chunk_delay,
+        "chunks": chunks,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-anthropic", daemon=True).start()
+    return server
+
+
+def rss_mb():
+    """Resident memory of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux and bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class SimulatedSession:
+    """One user going through upload, initial analysis and follow-ups"""
+
+    def __init__(self, follow_ups, poll, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.app.secrets["ANTHROPIC_API_KEY"] = "sk-ant-loadtest"
+        self.follow_ups = follow_ups
+        self.poll = poll
+        self.timeout = timeout
+        self.turn_latencies = []
+        self.render_times = []
+        self.errors = []
+        # Every session sends different content, otherwise all turns after the first are response-cache hits
+        self.nonce = uuid.uuid4().hex[:12]
+
+    def _run(self):
+        started = time.perf_counter()
+        with _RUN_LOCK:
+            self.app.run()
+        self.render_times.append(time.perf_counter() - started)
+        if self.app.exception:
+            raise RuntimeError(self.app.exception[0].value)
+
+    def _wait_for_turn(self, expected_messages, started):
+        deadline = started + self.timeout
+        while time.perf_counter() < deadline:
+            time.sleep(self.poll)
+            self._run()
+            state = self.app.session_state
+            if state["active_job"] is None and not state["job_queue"]:
+                if len(state["conversation_history"]) >= expected_messages:
+                    self.turn_latencies.append(time.perf_counter() - started)
+                    return
+                raise RuntimeError(state["last_error"] or "turn finished without a response")
+        raise TimeoutError(f"turn did not finish within {self.timeout}s")
+
+    def run(self):
+        try:
+            self._run()
+
+            # Upload - mirrors the "Start Debugging Session" handler
+            state = self.app.session_state
+            error_log = f"[load test session {self.nonce}]\n{SAMPLE_ERROR_LOG}"
+            state["files"] = dict(SAMPLE_FILES)
+            state["error_log"] = error_log
+            state["error_fingerprint"] = knowledge_base.fingerprint_traceback(error_log)
+            state["known_diagnosis"] = knowledge_base.lookup(state["error_fingerprint"])
+            state["files_uploaded"] = True
+            state["processing"] = True
+            started = time.perf_counter()
+            self._run()
+            self._wait_for_turn(2, started)
+
+            for index in range(self.follow_ups):
+                self.app.text_input[0].input(f"{FOLLOW_UPS[index % len(FOLLOW_UPS)]} ({self.nonce})")
+                send = next(button for button in self.app.button if button.label == "Send")
+                started = time.perf_counter()
+                send.click()
+                self._run()
+                self._wait_for_turn(2 * (index + 2), started)
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_level(sessions, follow_ups, poll, timeout):
+    """Run `sessions` concurrent sessions and summarize them"""
+    simulated = [SimulatedSession(follow_ups, poll, timeout) for _ in range(sessions)]
+    threads = [threading.Thread(target=session.run, name=f"session-{index}")
+               for index, session in enumerate(simulated)]
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = [value for session in simulated for value in session.turn_latencies]
+    renders = [value for session in simulated for value in session.render_times]
+    errors = [error for session in simulated for error in session.errors]
+    return {
+        "sessions": sessions,
+        "turns": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:3],
+        "elapsed_s": elapsed,
+        "throughput_turns_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "turn_p50_s": percentile(latencies, 50),
+        "turn_p95_s": percentile(latencies, 95),
+        "turn_p99_s": percentile(latencies, 99),
+        "render_mean_ms": statistics.mean(renders) * 1000 if renders else 0.0,
+        "render_p95_ms": percentile(renders, 95) * 1000,
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": rss_mb() - rss_before,
+    }
+
+
+def print_table(results):
+    header = (f"{'sessions':>8} {'turns':>6} {'errors':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} "
+              f"{'p99 s':>7} {'render ms':>9} {'render p95':>10} {'rss MB':>8} {'Δrss MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['sessions']:>8} {r['turns']:>6} {r['errors']:>6} {r['throughput_turns_per_s']:>8.2f} "
+              f"{r['turn_p50_s']:>7.2f} {r['turn_p95_s']:>7.2f} {r['turn_p99_s']:>7.2f} "
+              f"{r['render_mean_ms']:>9.1f} {r['render_p95_ms']:>10.1f} {r['rss_mb']:>8.1f} {r['rss_delta_mb']:>8.1f}")
+        for sample in r["error_samples"]:
+            print(f"{'':>8} ! {sample}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the CrewAI debugger with simulated sessions")
+    parser.add_argument("--sessions", default="1,5,10",
+                        help="comma-separated concurrent session counts to run (default: 1,5,10)")
+    parser.add_argument("--follow-ups", type=int, default=2, help="follow-up questions per session (default: 2)")
+    parser.add_argument("--first-token", type=float, default=0.5, help="fake backend time to first token in seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="fake backend delay between streamed chunks")
+    parser.add_argument("--chunks", type=int, default=40, help="streamed chunks per response")
+    parser.add_argument("--poll", type=float, default=0.5, help="rerun interval while a turn is streaming")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-turn timeout in seconds")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    server = start_fake_backend(args.first_token, args.chunk_delay, args.chunks)
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    # Keep simulated tracebacks out of the user's knowledge base
+    knowledge_base.KB_PATH = os.path.join(tempfile.gettempdir(), f"crewai_debugger_loadtest_{os.getpid()}.db")
+
+    results = []
+    for sessions in [int(value) for value in args.sessions.split(",") if value.strip()]:
+        print(f"Running {sessions} concurrent session(s)...", file=sys.stderr)
+        results.append(run_level(sessions, args.follow_ups, args.poll, args.timeout))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    server.shutdown()
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
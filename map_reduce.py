@@ -0,0 +1,267 @@
+"""Map-reduce analysis for crews too large for one request.
+
+When the files plus the error log would not fit in the model's context
+window, they are split along their own structure instead of by bytes:
+
+- agents.yaml / tasks.yaml: one unit per top-level agent or task
+- Python files: one unit per top-level function or class, with classes
+  that are too large (a @CrewBase class, a big BaseTool) split per method,
+  and the module-level code (imports, constants) as its own unit
+
+Units are packed into chunks that each fit comfortably in one request.
+Every map request sees its chunk plus a compact global symbol outline -
+agents, tasks, tools, crew wiring and the cross-file check results - so
+references to code in other chunks can still be judged. The reduce step
+merges the per-chunk findings against the same outline into the usual
+analysis. Original line numbers are kept: every chunk is a contiguous slice
+and says where it starts.
+"""
+import ast
+import os
+import re
+
+import crew_checks
+from context_encoder import estimate_tokens
+
+# Input-token budget for one request; above it the analysis is mapped over chunks
+CONTEXT_BUDGET_TOKENS = int(os.environ.get("CREWAI_DEBUGGER_CONTEXT_BUDGET", "150000"))
+CHUNK_TOKENS = int(os.environ.get("CREWAI_DEBUGGER_CHUNK_TOKENS", "30000"))
+MAP_MAX_TOKENS = 2000
+ERROR_LOG_CHARS = 20000
+OUTLINE_ITEMS = 400
+
+FILES = [
+    ("agents", "agents.yaml", "yaml"),
+    ("tasks", "tasks.yaml", "yaml"),
+    ("tools", "tools.py", "python"),
+    ("crew", "crew.py", "python"),
+    ("main", "main.py", "python"),
+]
+
+_YAML_KEY_RE = re.compile(r"^([A-Za-z_][\w\-]*|'[^']+'|\"[^\"]+\")\s*:")
+
+
+def needs_map_reduce(text):
+    """True when `text` would not fit in one request"""
+    return estimate_tokens(text) > CONTEXT_BUDGET_TOKENS
+
+
+def _yaml_units(source, kind):
+    """One unit per top-level key, running up to the next key (anything before the first is a header)"""
+    lines = source.splitlines()
+    starts = [index for index, line in enumerate(lines) if _YAML_KEY_RE.match(line)]
+    units = []
+    if not starts:
+        return [{"name": "(whole file)", "kind": kind, "start": 1, "end": len(lines)}] if lines else []
+    if starts[0] > 0:
+        units.append({"name": "(header)", "kind": "header", "start": 1, "end": starts[0]})
+    for position, start in enumerate(starts):
+        end = starts[position + 1] if position + 1 < len(starts) else len(lines)
+        name = _YAML_KEY_RE.match(lines[start]).group(1).strip("'\"")
+        units.append({"name": name, "kind": kind, "start": start + 1, "end": end})
+    return units
+
+
+def _node_start(node):
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [decorator.lineno for decorator in decorators])
+
+
+def _python_units(source, max_tokens):
+    """One unit per top-level function/class, large classes split per method"""
+    lines = source.splitlines()
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    units = []
+    covered = 0
+    for node in tree.body:
+        start, end = _node_start(node), node.end_lineno
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if start - 1 > covered:
+            units.append({"name": "(module code)", "kind": "module", "start": covered + 1, "end": start - 1})
+        text = "\n".join(lines[start - 1:end])
+        methods = [child for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))] \
+            if isinstance(node, ast.ClassDef) else []
+        if methods and estimate_tokens(text) > max_tokens:
+            first = _node_start(methods[0])
+            units.append({"name": f"class {node.name}", "kind": "class", "start": start, "end": first - 1})
+            for index, method in enumerate(methods):
+                method_end = _node_start(methods[index + 1]) - 1 if index + 1 < len(methods) else end
+                units.append({"name": f"{node.name}.{method.name}", "kind": _python_kind(method),
+                              "start": _node_start(method), "end": method_end})
+        else:
+            prefix = "class " if isinstance(node, ast.ClassDef) else ""
+            units.append({"name": f"{prefix}{node.name}", "kind": _python_kind(node), "start": start, "end": end})
+        covered = end
+    if covered < len(lines):
+        units.append({"name": "(module code)", "kind": "module", "start": covered + 1, "end": len(lines)})
+    return units
+
+
+def _python_kind(node):
+    names = crew_checks._decorator_names(node) if not isinstance(node, ast.ClassDef) else []
+    for name in ("tool", "agent", "task", "crew"):
+        if name in names:
+            return name
+    if isinstance(node, ast.ClassDef):
+        bases = [base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "") for base in node.bases]
+        return "tool" if "BaseTool" in bases else "class"
+    return "function"
+
+
+def _split_lines(unit, lines, max_tokens):
+    """Cut a unit that alone exceeds the chunk budget into line ranges"""
+    parts = []
+    start = unit["start"]
+    while start <= unit["end"]:
+        end = start
+        tokens = 0
+        while end <= unit["end"]:
+            tokens += estimate_tokens(lines[end - 1]) + 1
+            if tokens > max_tokens and end > start:
+                break
+            end += 1
+        parts.append({**unit, "name": f"{unit['name']} (part {len(parts) + 1})", "start": start, "end": end - 1})
+        start = end
+    return parts
+
+
+def chunk_files(files, max_tokens=None):
+    """Split the uploaded files into chunks of whole units
+
+    Returns [{'file', 'name', 'language', 'start', 'end', 'units', 'text', 'tokens'}];
+    `text` is the original slice from line `start` to `end`.
+    """
+    max_tokens = max_tokens or CHUNK_TOKENS
+    chunks = []
+    for key, name, language in FILES:
+        source = files.get(key)
+        if not source:
+            continue
+        lines = source.splitlines()
+        units = _yaml_units(source, key[:-1]) if language == "yaml" else _python_units(source, max_tokens)
+        if not units:
+            units = [{"name": "(whole file)", "kind": "file", "start": 1, "end": len(lines)}]
+        current = None
+        for unit in units:
+            text = "\n".join(lines[unit["start"] - 1:unit["end"]])
+            tokens = estimate_tokens(text)
+            pieces = _split_lines(unit, lines, max_tokens) if tokens > max_tokens else [unit]
+            for piece in pieces:
+                piece_tokens = tokens if piece is unit else \
+                    estimate_tokens("\n".join(lines[piece["start"] - 1:piece["end"]]))
+                if current is None or current["tokens"] + piece_tokens > max_tokens:
+                    current = {"file": name, "language": language, "start": piece["start"],
+                               "end": piece["end"], "units": [], "tokens": 0}
+                    chunks.append(current)
+                current["end"] = piece["end"]
+                current["units"].append(piece["name"])
+                current["tokens"] += piece_tokens
+        for chunk in chunks:
+            if chunk["file"] == name:
+                chunk["text"] = "\n".join(lines[chunk["start"] - 1:chunk["end"]])
+    for chunk in chunks:
+        units = [unit for unit in chunk["units"] if not unit.startswith("(")] or chunk["units"]
+        label = ", ".join(units[:3]) + (f" +{len(units) - 3} more" if len(units) > 3 else "")
+        chunk["name"] = f"{chunk['file']}: {label} (lines {chunk['start']}-{chunk['end']})"
+    return chunks
+
+
+def _tool_outline(source):
+    """Tool names with their signatures or BaseTool class names from tools.py"""
+    items = []
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return items
+    for node in ast.walk(tree):
+        kind = _python_kind(node) if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) else None
+        if kind != "tool":
+            continue
+        if isinstance(node, ast.ClassDef):
+            items.append(f"class {node.name}(BaseTool) @ line {node.lineno}")
+        else:
+            arguments = ", ".join(argument.arg for argument in node.args.args)
+            items.append(f"@tool {node.name}({arguments}) @ line {node.lineno}")
+    return items
+
+
+def symbol_outline(files):
+    """Compact global outline of agents, tasks, tools and crew wiring, shared by every map and the reduce"""
+    lines = []
+    agents = crew_checks.load_yaml(files.get("agents")) or {}
+    tasks = crew_checks.load_yaml(files.get("tasks")) or {}
+    if agents:
+        lines.append("Agents (agents.yaml):")
+        for name, config in list(agents.items())[:OUTLINE_ITEMS]:
+            config = config if isinstance(config, dict) else {}
+            role = re.sub(r"\s+", " ", str(config.get("role", ""))).strip()[:80]
+            tools = config.get("tools")
+            lines.append(f"- {name}: {role}" + (f" | tools: {', '.join(map(str, tools))}" if isinstance(tools, list) else ""))
+    if tasks:
+        lines.append("Tasks (tasks.yaml, in order):")
+        for name, config in list(tasks.items())[:OUTLINE_ITEMS]:
+            config = config if isinstance(config, dict) else {}
+            context = config.get("context")
+            context = ", ".join(map(str, context)) if isinstance(context, list) else context
+            lines.append(f"- {name}: agent={config.get('agent', '?')}" + (f" | context: {context}" if context else ""))
+    if files.get("tools"):
+        tools = _tool_outline(files["tools"])
+        lines.append(f"Tools (tools.py, {len(tools)}):")
+        lines.extend(f"- {item}" for item in tools[:OUTLINE_ITEMS])
+        if len(tools) > OUTLINE_ITEMS:
+            lines.append(f"- ... {len(tools) - OUTLINE_ITEMS} more")
+    if files.get("crew"):
+        crew = crew_checks.parse_crew(files["crew"])
+        settings = crew_checks.parse_crew_settings(files["crew"])
+        lines.append("crew.py:")
+        lines.append("- @agent methods: " + ", ".join(f"{name}@{line}" for name, line in crew["agent_methods"][:OUTLINE_ITEMS]))
+        lines.append("- @task methods: " + ", ".join(f"{name}@{line}" for name, line in crew["task_methods"][:OUTLINE_ITEMS]))
+        if settings["crew"]:
+            lines.append("- Crew(" + ", ".join(f"{key}={value!r}" for key, value in settings["crew"].items()) + ")")
+    issues = crew_checks.cross_file_checks(files)
+    if issues:
+        lines.append("Cross-file issues found locally:")
+        lines.extend(f"- {issue}" for issue in issues[:100])
+    return "\n".join(lines)
+
+
+def map_content(outline, chunk, index, total, error_log=""):
+    """User content for one map request; the shared outline is a separate cacheable block"""
+    shared = f"# PROJECT OUTLINE\n{outline}\n"
+    if error_log.strip():
+        # Tracebacks end with the interesting part
+        shared += f"\n# ERROR LOG (last {ERROR_LOG_CHARS:,} characters)\n```\n{error_log[-ERROR_LOG_CHARS:]}\n```\n"
+    chunk_text = (
+        f"# CHUNK {index} OF {total}: {chunk['name']}\n"
+        f"The following is {chunk['file']} starting at line {chunk['start']}; lines continue consecutively.\n"
+        f"```{chunk['language']}\n{chunk['text']}\n```\n\n"
+        "This project is too large for one request, so you are reviewing one chunk of it. List only concrete "
+        "issues in this chunk, one bullet each with `file:line`, severity (critical/warning/info), the problem and "
+        "the fix. Use the outline to check references to agents, tasks and tools defined elsewhere; do not "
+        "report code you cannot see. Reply with 'No issues.' if there are none."
+    )
+    return [
+        {"type": "text", "text": shared, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": chunk_text},
+    ]
+
+
+def reduce_content(outline, chunks, findings, user_message, extra_sections=""):
+    """User content for the reduce request that turns per-chunk findings into the final answer"""
+    parts = [
+        "This CrewAI project is too large to send in one request. Each chunk below was reviewed separately "
+        "against the project outline; merge the findings into one analysis. Drop duplicates, resolve issues that "
+        "span chunks using the outline, and cite original file:line references.\n",
+        f"## PROJECT OUTLINE\n{outline}\n",
+    ]
+    if extra_sections:
+        parts.append(extra_sections)
+    parts.append("## PER-CHUNK FINDINGS")
+    for chunk, finding in zip(chunks, findings):
+        parts.append(f"### {chunk['name']}\n{finding if finding is not None else '(analysis failed for this chunk)'}\n")
+    parts.append(user_message)
+    return "\n".join(parts)
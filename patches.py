@@ -0,0 +1,280 @@
+"""Apply and validate the unified diffs the assistant proposes.
+
+Diffs are taken from ```diff blocks in an answer, applied in memory to the
+uploaded files and checked locally - Python must compile, YAML must load and
+the patched set must not add new cross-file issues - so only patches that
+fail go back to the model for another round.
+"""
+import bisect
+import hashlib
+import re
+from collections import Counter
+
+import context_encoder
+import crew_checks
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - PyYAML is in requirements.txt
+    yaml = None
+
+# Uploaded file keys and the names the model is told to use in diff headers
+FILE_NAMES = {
+    "agents": "agents.yaml",
+    "tasks": "tasks.yaml",
+    "tools": "tools.py",
+    "crew": "crew.py",
+    "main": "main.py",
+}
+
+_DIFF_BLOCK_RE = re.compile(r"```(?:diff|patch)[^\n]*\n(.*?)```", re.DOTALL)
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_FUZZ_LINES = 50
+_MARKER_RE = re.compile(re.escape(context_encoder.MARKER_PREFIX) + r"\d+$")
+
+
+class PatchError(Exception):
+    """A diff that could not be parsed or applied"""
+
+
+def file_key(path):
+    """Map a diff header path such as 'b/config/tasks.yml' to an uploaded file key"""
+    name = path.strip().split("\t")[0].rsplit("/", 1)[-1].lower()
+    name = name.replace(".yml", ".yaml")
+    for key, file_name in FILE_NAMES.items():
+        if name == file_name:
+            return key
+    return None
+
+
+def parse_diffs(text):
+    """Extract [{'file': key, 'path': str, 'hunks': [...]}] from the diff blocks in `text`"""
+    patches = []
+    for block in _DIFF_BLOCK_RE.findall(text):
+        current = None
+        hunk = None
+        block_lines = block.splitlines()
+        for index, line in enumerate(block_lines):
+            next_line = block_lines[index + 1] if index + 1 < len(block_lines) else ""
+            if line.startswith("--- ") and next_line.startswith("+++ "):
+                current = {"file": None, "path": line[4:].strip(), "hunks": []}
+                hunk = None
+                continue
+            if line.startswith("+++ ") and current is not None and not current["hunks"]:
+                target = line[4:].strip()
+                if target != "/dev/null":
+                    current["path"] = target
+                current["file"] = file_key(current["path"])
+                patches.append(current)
+                continue
+            match = _HUNK_RE.match(line)
+            if match and current is not None:
+                _close_hunk(hunk)
+                hunk = {"old_start": int(match.group(1)), "old_count": int(match.group(2) or 1),
+                        "lines": [], "bare": 0}
+                current["hunks"].append(hunk)
+                continue
+            if hunk is None:
+                continue
+            if line.startswith(("+", "-", " ")):
+                hunk["lines"].append((line[0], line[1:]))
+                hunk["bare"] = 0
+            elif line == "":
+                # Editors and models often drop the space on blank context lines
+                hunk["lines"].append((" ", ""))
+                hunk["bare"] += 1
+            elif line.startswith("\\"):
+                continue
+        _close_hunk(hunk)
+    return [patch for patch in patches if patch["hunks"]]
+
+
+def _close_hunk(hunk):
+    """Drop bare blank lines at the end of a hunk that go beyond its declared old line count
+
+    They are almost always spacing before the closing fence or the next hunk, not context.
+    """
+    if hunk is None:
+        return
+    old_lines = sum(1 for kind, _ in hunk["lines"] if kind in (" ", "-"))
+    bare = hunk.pop("bare", 0)
+    while bare and old_lines > hunk["old_count"]:
+        hunk["lines"].pop()
+        old_lines -= 1
+        bare -= 1
+
+
+def _matches(lines, position, expected):
+    if position < 0 or position + len(expected) > len(lines):
+        return False
+    return all(lines[position + index].rstrip() == line.rstrip() for index, line in enumerate(expected))
+
+
+def apply_patch(source, hunks):
+    """Apply hunks to `source`, tolerating shifted line numbers; raises PatchError"""
+    lines = source.splitlines()
+    offset = 0
+    for number, hunk in enumerate(hunks, start=1):
+        old = [text for kind, text in hunk["lines"] if kind in (" ", "-")]
+        new = [text for kind, text in hunk["lines"] if kind in (" ", "+")]
+        expected = max(hunk["old_start"] - 1 + offset, 0)
+        if not old:
+            # Pure insertion: "-N,0" means after line N
+            position = min(max(hunk["old_start"] + offset, 0), len(lines))
+        else:
+            position = _find(lines, old, expected, number, hunk)
+        lines[position:position + len(old)] = new
+        offset += len(new) - len(old)
+    trailing = "\n" if source.endswith("\n") or not source else ""
+    return "\n".join(lines) + trailing
+
+
+def _find(lines, old, expected, number, hunk):
+    """Position of the hunk's old lines nearest to `expected`; raises PatchError"""
+    for distance in range(_FUZZ_LINES + 1):
+        for candidate in (expected - distance, expected + distance):
+            if _matches(lines, candidate, old):
+                return candidate
+    # Fall back to a unique match anywhere in the file
+    candidates = [index for index in range(len(lines) - len(old) + 1) if _matches(lines, index, old)]
+    if len(candidates) != 1:
+        raise PatchError(f"hunk {number} (at line {hunk['old_start']}) does not match the file")
+    return candidates[0]
+
+
+def apply_patch_compacted(source, encoded, line_map, hunks):
+    """Apply hunks written against the compacted text of `source` to `source` itself; raises PatchError
+
+    Hunks are located in the compacted lines (with or without the `#@N`
+    markers) and replayed on the original through `line_map`: context lines
+    keep their original text, so stripped comments and docstrings survive
+    unless the lines they belong to are removed.
+    """
+    view = [(text, number) for text, number in zip(encoded.splitlines(), line_map) if number is not None]
+    view_lines = [text for text, _ in view]
+    numbers = [number for _, number in view]
+    deleted = set()
+    inserted = {}
+    for index, hunk in enumerate(hunks, start=1):
+        body = [(kind, text) for kind, text in hunk["lines"]
+                if not (kind != "+" and _MARKER_RE.match(text.strip()))]
+        old = [text for kind, text in body if kind in (" ", "-")]
+        if not old:
+            # Pure insertion: "-N,0" means after original line N
+            inserted.setdefault(hunk["old_start"], []).extend(text for _, text in body)
+            continue
+        # Line numbers in the hunk header are original ones
+        expected = bisect.bisect_left(numbers, hunk["old_start"])
+        position = _find(view_lines, old, expected, index, hunk)
+        anchor = numbers[position] - 1
+        for kind, text in body:
+            if kind == "+":
+                inserted.setdefault(anchor, []).append(text)
+                continue
+            anchor = numbers[position]
+            if kind == "-":
+                deleted.add(anchor)
+            position += 1
+    lines = list(inserted.get(0, []))
+    for number, line in enumerate(source.splitlines(), start=1):
+        if number not in deleted:
+            lines.append(line)
+        lines.extend(inserted.get(number, []))
+    trailing = "\n" if source.endswith("\n") or not source else ""
+    return "\n".join(lines) + trailing
+
+
+def validate_file(key, text):
+    """Syntax-check one patched file; returns a list of errors"""
+    file_name = FILE_NAMES.get(key, key)
+    if file_name.endswith(".py"):
+        try:
+            compile(text, file_name, "exec")
+        except SyntaxError as e:
+            return [f"{file_name}:{e.lineno}: SyntaxError: {e.msg}"]
+    elif yaml is not None:
+        try:
+            yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            mark = getattr(e, "problem_mark", None)
+            where = f":{mark.line + 1}" if mark is not None else ""
+            problem = getattr(e, "problem", None) or str(e)
+            return [f"{file_name}{where}: YAML error: {problem}"]
+    return []
+
+
+def digest(text):
+    """Short content hash used to tell whether a file changed since a patch was built"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _apply(source, hunks, name, compacted):
+    try:
+        return apply_patch(source, hunks)
+    except PatchError:
+        if not compacted:
+            raise
+        report = context_encoder.encode_file(source, "python" if name.endswith(".py") else "yaml")
+        if not report["encoded"]:
+            raise
+    return apply_patch_compacted(source, report["text"], report["line_map"], hunks)
+
+
+def process_answer(text, files, compacted=False):
+    """Apply every diff in an answer to `files` and validate the results
+
+    With `compacted`, the model saw the files through context_encoder, so a
+    diff that does not apply to the uploaded text is tried against the
+    compacted text and mapped back. Returns a list of {'file', 'name', 'ok',
+    'errors', 'text'}; `text` is the patched file for patches that passed, and
+    `base` the digest of the uploaded file it was built from.
+    """
+    results = []
+    patched = dict(files)
+    for patch in parse_diffs(text):
+        key = patch["file"]
+        if key is None:
+            results.append({"file": None, "name": patch["path"], "ok": False, "text": None,
+                            "errors": [f"'{patch['path']}' is not one of the uploaded files ({', '.join(FILE_NAMES.values())})"]})
+            continue
+        name = FILE_NAMES[key]
+        if key not in patched:
+            results.append({"file": key, "name": name, "ok": False, "text": None,
+                            "errors": [f"{name} was not uploaded"]})
+            continue
+        try:
+            new_text = _apply(patched[key], patch["hunks"], name, compacted and patched[key] is files[key])
+        except PatchError as e:
+            results.append({"file": key, "name": name, "ok": False, "text": None, "errors": [f"{name}: {e}"]})
+            continue
+        errors = validate_file(key, new_text)
+        if not errors:
+            # Cross-file checks may only get better, never worse
+            # Compared without line numbers, so a patch that only shifts lines adds nothing new
+            before = Counter(map(crew_checks.issue_key, crew_checks.cross_file_checks(patched)))
+            errors = []
+            for issue in crew_checks.cross_file_checks({**patched, key: new_text}):
+                if before[crew_checks.issue_key(issue)]:
+                    before[crew_checks.issue_key(issue)] -= 1
+                else:
+                    errors.append(f"new issue: {issue}")
+        if errors:
+            results.append({"file": key, "name": name, "ok": False, "text": None, "errors": errors})
+        else:
+            patched[key] = new_text
+            results.append({"file": key, "name": name, "ok": True, "text": new_text, "errors": [],
+                            "base": digest(files[key])})
+    return results
+
+
+def correction_request(results):
+    """Follow-up message asking the model to fix the patches that failed validation"""
+    failed = [result for result in results if not result["ok"]]
+    details = "\n".join(f"- **{result['name']}**: " + "; ".join(result["errors"]) for result in failed)
+    return (
+        "Some of the patches you proposed failed local validation:\n\n"
+        f"{details}\n\n"
+        "Please resend corrected unified diffs (in ```diff blocks with --- a/<file> and +++ b/<file> headers) "
+        "for only these files, against the file contents as shown to you (for compacted files, the compacted "
+        "text; `#@N` marker lines may be left out)."
+    )
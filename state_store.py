@@ -0,0 +1,498 @@
+"""Shared state backends so any app worker can serve any turn.
+
+Session state, the response cache and rate-limit counters live behind a small
+key-value interface. The backend is chosen with CREWAI_DEBUGGER_STATE_URL:
+
+- memory://                 (default) process-local, the original behaviour
+- sqlite:////abs/state.db   a file shared by workers on one host
+                            (three slashes for a relative path)
+- redis://[:password@]host:port/db
+                            any server speaking the Redis protocol, shared
+                            across nodes
+
+For local testing of the network backend, `python state_store.py --port 6380`
+starts a small stand-in server that speaks the subset of the protocol used here.
+"""
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# Expired entries are swept on writes at most this often, so keys that are never read again still go
+PURGE_INTERVAL = 60
+
+
+class StateBackend:
+    """Key-value interface for shared state; values must be JSON-serializable"""
+
+    # False when other workers cannot see the data, so there is no point mirroring sessions into it
+    shared = True
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Set `key` only if it is absent; returns True if it was set"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key, amount=1, ttl=None):
+        """Atomically add to an integer counter; `ttl` applies when the counter is created"""
+        raise NotImplementedError
+
+
+class MemoryBackend(StateBackend):
+    """Process-local backend"""
+
+    shared = False
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._purged_at = time.time()
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._purged_at < PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        for key in [key for key, entry in self._data.items() if entry[1] is not None and entry[1] <= now]:
+            del self._data[key]
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else json.loads(entry[0])
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._purge_expired()
+            self._data[key] = (json.dumps(value), time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            self._purge_expired()
+            if self._live(key) is not None:
+                return False
+            self._data[key] = (json.dumps(value), time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key, amount=1, ttl=None):
+        with self._lock:
+            self._purge_expired()
+            entry = self._live(key)
+            if entry is None:
+                value, expires = amount, (time.time() + ttl if ttl else None)
+            else:
+                value, expires = int(json.loads(entry[0])) + amount, entry[1]
+            self._data[key] = (json.dumps(value), expires)
+            return value
+
+
+class SQLiteBackend(StateBackend):
+    """Backend stored in a SQLite file, shared by workers on the same host"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS kv (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_kv_expires_at ON kv (expires_at)")
+        self._purged_at = 0.0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _purge_expired(self):
+        # Per process; the DELETE is cheap with the index and harmless when several workers run it
+        now = time.time()
+        if now - self._purged_at < PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        self._connect().execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def _purge(self, conn, key):
+        conn.execute("DELETE FROM kv WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                     (key, time.time()))
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        self._purge_expired()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key, value, ttl=None):
+        self._purge_expired()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._purge(conn, key)
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + ttl if ttl else None)
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount == 1
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key, amount=1, ttl=None):
+        self._purge_expired()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._purge(conn, key)
+            conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+                (key, json.dumps(amount), time.time() + ttl if ttl else None, amount)
+            )
+            value = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+            return int(value)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RedisBackend(StateBackend):
+    """Backend on any server speaking the Redis protocol (RESP)"""
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.password:
+                self._call("AUTH", self.password)
+            if self.db:
+                self._call("SELECT", self.db)
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def _send(self, *commands):
+        sock, reader = self._connection()
+        payload = []
+        for args in commands:
+            payload.append(f"*{len(args)}\r\n".encode())
+            for arg in args:
+                data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+                payload.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        sock.sendall(b"".join(payload))
+        replies = [_read_reply(reader) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def _call(self, *args):
+        return self._send(args)[0]
+
+    def _command(self, *args):
+        # One reconnect covers a server restart or an idle connection being dropped
+        try:
+            return self._call(*args)
+        except (OSError, ConnectionError):
+            self._drop_connection()
+            return self._call(*args)
+
+    def _once(self, *commands):
+        """Send commands whose effect must not be repeated (counters, NX sets), never retrying them
+
+        A PING first gets a fresh connection if the old one was dropped, so a failure after that is real.
+        """
+        self._command("PING")
+        try:
+            return self._send(*commands)
+        except (OSError, ConnectionError):
+            self._drop_connection()
+            raise
+
+    def get(self, key):
+        value = self._command("GET", key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._command("SET", key, json.dumps(value), "PX", int(ttl * 1000))
+        else:
+            self._command("SET", key, json.dumps(value))
+
+    def add(self, key, value, ttl=None):
+        if ttl:
+            reply = self._once(("SET", key, json.dumps(value), "NX", "PX", int(ttl * 1000)))[0]
+        else:
+            reply = self._once(("SET", key, json.dumps(value), "NX"))[0]
+        return reply == "OK"
+
+    def delete(self, key):
+        self._command("DEL", key)
+
+    def incr(self, key, amount=1, ttl=None):
+        if not ttl:
+            return self._once(("INCRBY", key, amount))[0]
+        # Creating the key with its TTL and incrementing it in one transaction never leaves a counter without a TTL
+        replies = self._once(("MULTI",), ("SET", key, "0", "NX", "PX", int(ttl * 1000)),
+                             ("INCRBY", key, amount), ("EXEC",))
+        if replies[-1] is None or isinstance(replies[-1][-1], RespError):
+            raise RespError(f"INCRBY {key} failed: {replies[-1]}")
+        return replies[-1][-1]
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode("utf-8")
+    if prefix == b"-":
+        # Returned rather than raised so the rest of a pipelined or EXEC reply is still read
+        return RespError(rest.decode("utf-8"))
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2].decode("utf-8")
+    if prefix == b"*":
+        count = int(rest)
+        return None if count < 0 else [_read_reply(reader) for _ in range(count)]
+    raise RespError(f"unexpected reply: {line!r}")
+
+
+def backend_from_url(url):
+    """Create a backend from a memory://, sqlite:/// or redis:// URL"""
+    if not url or url.startswith("memory:"):
+        return MemoryBackend()
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # As in SQLAlchemy: sqlite:///relative.db, sqlite:////absolute/path.db
+        path = parsed.path[1:] if parsed.path.startswith("/") else parsed.path
+        if parsed.netloc:
+            path = os.path.join(parsed.netloc, path)
+        return SQLiteBackend(os.path.expanduser(path))
+    if parsed.scheme == "redis":
+        db = parsed.path.lstrip("/")
+        return RedisBackend(
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=parsed.password,
+        )
+    raise ValueError(f"Unsupported CREWAI_DEBUGGER_STATE_URL scheme: {parsed.scheme}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide backend configured by CREWAI_DEBUGGER_STATE_URL"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = backend_from_url(os.environ.get("CREWAI_DEBUGGER_STATE_URL", "memory://"))
+    return _backend
+
+
+class _Status(str):
+    """A RESP simple-string reply such as +OK"""
+
+
+def _encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, bool):
+        return b"+OK\r\n" if value else b"$-1\r\n"
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_encode_reply(item) for item in value)
+    if isinstance(value, _Status):
+        return f"+{value}\r\n".encode()
+    data = value.encode("utf-8")
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Serves GET/SET/DEL/INCRBY/PEXPIRE/PING and MULTI/EXEC from a MemoryBackend"""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+
+    def _execute(self, args):
+        store = self.server.store
+        name = args[0].upper()
+        try:
+            if name == "PING":
+                return _Status("PONG")
+            if name in ("AUTH", "SELECT"):
+                return _Status("OK")
+            if name == "GET":
+                entry = store.get(args[1])
+                return None if entry is None else json.dumps(entry)
+            if name == "SET":
+                options = [option.upper() for option in args[3:]]
+                ttl = None
+                if "PX" in options:
+                    ttl = int(args[3 + options.index("PX") + 1]) / 1000
+                elif "EX" in options:
+                    ttl = int(args[3 + options.index("EX") + 1])
+                value = json.loads(args[2])
+                if "NX" in options:
+                    return store.add(args[1], value, ttl)
+                store.set(args[1], value, ttl)
+                return _Status("OK")
+            if name == "DEL":
+                store.delete(args[1])
+                return 1
+            if name == "INCRBY":
+                return store.incr(args[1], int(args[2]))
+            if name == "PEXPIRE":
+                with store._lock:
+                    entry = store._live(args[1])
+                    if entry is not None:
+                        store._data[args[1]] = (entry[0], time.time() + int(args[2]) / 1000)
+                return 1 if entry is not None else 0
+            return RespError(f"ERR unknown command '{name}'")
+        except (IndexError, ValueError) as e:
+            return RespError(f"ERR {e}")
+
+    def handle(self):
+        queued = None
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            name = args[0].upper()
+            if name == "MULTI":
+                queued = []
+                reply = _Status("OK")
+            elif name == "EXEC":
+                if queued is None:
+                    reply = RespError("ERR EXEC without MULTI")
+                else:
+                    # One lock for every command keeps a transaction from interleaving with other clients
+                    with self.server.lock:
+                        reply = [self._execute(command) for command in queued]
+                    queued = None
+            elif queued is not None:
+                queued.append(args)
+                reply = _Status("QUEUED")
+            else:
+                with self.server.lock:
+                    reply = self._execute(args)
+            self.wfile.write(_encode_reply(reply))
+            self.wfile.flush()
+
+
+class RespStandInServer(socketserver.ThreadingTCPServer):
+    """Minimal in-memory Redis-protocol server for local testing"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _RespHandler)
+        self.store = MemoryBackend()
+        self.lock = threading.Lock()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local Redis-protocol stand-in for the state backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    args = parser.parse_args()
+
+    server = RespStandInServer((args.host, args.port))
+    print(f"Serving on redis://{args.host}:{args.port}/0 - press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
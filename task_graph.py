@@ -0,0 +1,259 @@
+"""Task dependency graph, critical path and parallelism hints for a crew.
+
+Edges come from `context:` in tasks.yaml or `context=[...]` in crew.py. A
+task without an explicit context receives the output of the task just
+before it in CrewAI, so it implicitly depends on its predecessor - which
+turns most crews into a chain. Durations come from an uploaded run profile
+where task names match, otherwise from the static cost estimate.
+
+Two schedules are compared: how CrewAI runs the tasks today (in order,
+with consecutive `async_execution` tasks overlapping until the next
+synchronous task) and the critical path of the dependency graph, which is
+the best any restructuring can do.
+"""
+import re
+
+import cost_estimator
+import crew_checks
+
+
+def _match_key(text):
+    """Comparable prefix of a task name or description, up to the first {placeholder}"""
+    return re.sub(r"\s+", " ", str(text).split("{")[0]).strip().lower()[:40]
+
+
+def _measured_durations(tasks, profile):
+    """Map task keys to the mean duration of one run measured in a profile, matched by key or description"""
+    measured = {}
+    if not profile:
+        return measured
+    # A log can hold several kickoffs or retried tasks; the graph needs the time of a single run
+    for task_name, totals in profile["task_totals"].items():
+        if totals["duration"] is None:
+            continue
+        name = _match_key(task_name)
+        for key, config in tasks.items():
+            description = config.get("description", "") if isinstance(config, dict) else ""
+            if name == key.lower() or (_match_key(description) and name.startswith(_match_key(description))):
+                measured[key] = totals["duration"] / totals["runs"]
+                break
+    return measured
+
+
+def find_cycle(dependencies):
+    """Return one dependency cycle as a list of task names, or None"""
+    state = {}
+
+    def visit(node, path):
+        state[node] = "visiting"
+        path.append(node)
+        for dependency in dependencies.get(node, []):
+            if state.get(dependency) == "visiting":
+                return path[path.index(dependency):] + [dependency]
+            if dependency in dependencies and dependency not in state:
+                cycle = visit(dependency, path)
+                if cycle:
+                    return cycle
+        path.pop()
+        state[node] = "done"
+        return None
+
+    for node in dependencies:
+        if node not in state:
+            cycle = visit(node, [])
+            if cycle:
+                return cycle
+    return None
+
+
+def build_graph(files, profile=None, estimate=None):
+    """Build the task graph of the uploaded crew; returns a dict or None when tasks.yaml is unusable
+
+    Pass `estimate` when cost_estimator.estimate_crew has already run on the same files.
+    """
+    tasks = crew_checks.load_yaml(files.get("tasks"))
+    if not tasks:
+        return None
+    tasks = {key: config for key, config in tasks.items() if isinstance(config, dict)}
+    if not tasks:
+        return None
+    order = list(tasks)
+    estimate = estimate or cost_estimator.estimate_crew(files)
+    estimated = {result["name"]: result["seconds"][0] for result in estimate["tasks"]}
+    measured = _measured_durations(tasks, profile)
+
+    nodes = {}
+    dependencies = {}
+    for index, key in enumerate(order):
+        result = next(result for result in estimate["tasks"] if result["name"] == key)
+        nodes[key] = {
+            "agent": result["agent"],
+            "async_execution": result["async_execution"],
+            "duration": measured.get(key, estimated.get(key, 0.0)),
+            "source": "measured" if key in measured else "estimated",
+            "implicit": not result["explicit_context"] and index > 0,
+        }
+        dependencies[key] = [dependency for dependency in result["context"] if dependency in tasks]
+
+    issues = []
+    cycle = find_cycle(dependencies)
+    if cycle:
+        issues.append("Circular context: " + " -> ".join(cycle))
+    for index, key in enumerate(order):
+        for dependency in dependencies[key]:
+            if order.index(dependency) > index:
+                issues.append(f"Task '{key}' uses context from '{dependency}', which runs after it")
+    if nodes and nodes[order[-1]]["async_execution"]:
+        issues.append(f"The last task '{order[-1]}' is async; CrewAI requires the crew to end with a synchronous task")
+
+    graph = {
+        "order": order,
+        "nodes": nodes,
+        "dependencies": dependencies,
+        "process": estimate["process"],
+        "issues": issues,
+        "cycle": cycle,
+        "current_seconds": None,
+        "critical_path": [],
+        "critical_seconds": None,
+        "suggestions": [],
+    }
+    if cycle:
+        return graph
+
+    graph["current_seconds"] = _current_schedule(order, nodes, dependencies)
+    finish = {}
+    previous = {}
+    # Tasks are listed in run order and context only points backwards once issues are ruled out
+    for key in _topological(order, dependencies):
+        start = 0.0
+        for dependency in dependencies[key]:
+            if finish.get(dependency, 0.0) > start:
+                start = finish[dependency]
+                previous[key] = dependency
+        finish[key] = start + nodes[key]["duration"]
+    if finish:
+        last = max(finish, key=finish.get)
+        path = [last]
+        while path[-1] in previous:
+            path.append(previous[path[-1]])
+        graph["critical_path"] = path[::-1]
+        graph["critical_seconds"] = finish[last]
+    graph["suggestions"] = _suggestions(order, nodes, dependencies, graph)
+    return graph
+
+
+def _topological(order, dependencies):
+    done = []
+    seen = set()
+
+    def visit(node):
+        if node in seen:
+            return
+        seen.add(node)
+        for dependency in dependencies[node]:
+            visit(dependency)
+        done.append(node)
+
+    for node in order:
+        visit(node)
+    return done
+
+
+def _current_schedule(order, nodes, dependencies):
+    """Latency of the run as CrewAI schedules it today"""
+    cursor = 0.0
+    pending = []
+    finish = {}
+    for key in order:
+        if nodes[key]["async_execution"]:
+            start = max([cursor] + [finish.get(dependency, 0.0) for dependency in dependencies[key]])
+            finish[key] = start + nodes[key]["duration"]
+            pending.append(finish[key])
+        else:
+            # A synchronous task waits for every async task launched before it
+            cursor = max([cursor] + pending)
+            pending = []
+            finish[key] = cursor + nodes[key]["duration"]
+            cursor = finish[key]
+    return max([cursor] + pending)
+
+
+def _suggestions(order, nodes, dependencies, graph):
+    suggestions = []
+    # A synchronous task waits for all async tasks before it, so parallelism comes from
+    # runs of consecutive independent tasks that are all async and followed by a sync task
+    index = 0
+    while index < len(order) - 1:
+        run = [order[index]]
+        for key in order[index + 1:-1]:
+            if nodes[key]["implicit"] or any(dependency in run for dependency in dependencies[key]):
+                break
+            run.append(key)
+        if len(run) > 1 and not all(nodes[key]["async_execution"] for key in run):
+            names = ", ".join(f"'{key}'" for key in run)
+            waiting = order[index + len(run)]
+            suggestions.append(f"{names} do not depend on each other - set async_execution: true on all of them "
+                               f"to run them concurrently ('{waiting}' then waits for them)")
+        index += len(run)
+    implicit = [key for index, key in enumerate(order) if nodes[key]["implicit"] and index > 0]
+    if implicit:
+        suggestions.append("No explicit context on " + ", ".join(f"'{key}'" for key in implicit)
+                           + " - CrewAI passes each the previous task's output, which chains it to that task "
+                             "and hides anything earlier. List the tasks each one really needs (context: [] for none).")
+    if graph["current_seconds"] and graph["critical_seconds"] is not None \
+            and graph["critical_seconds"] < graph["current_seconds"] * 0.9:
+        suggestions.append(f"Restructuring around the dependency graph could cut the run from "
+                           f"~{graph['current_seconds']:.0f}s to ~{graph['critical_seconds']:.0f}s")
+    return suggestions
+
+
+def to_dot(graph):
+    """Graphviz DOT source for st.graphviz_chart; the critical path is drawn in red"""
+    critical = set(graph["critical_path"])
+    critical_edges = set(zip(graph["critical_path"], graph["critical_path"][1:]))
+    cycle_edges = set(zip(graph["cycle"], graph["cycle"][1:])) if graph["cycle"] else set()
+    lines = ["digraph tasks {", "  rankdir=LR;", '  node [shape=box, style="rounded,filled", fillcolor="#f5f5f5"];']
+    for key in graph["order"]:
+        node = graph["nodes"][key]
+        label = f"{key}\\n{node['agent'] or '?'}\\n{node['duration']:.0f}s ({node['source']})"
+        attributes = [f'label="{label}"']
+        if key in critical:
+            attributes.append('color="#d62728", penwidth=2')
+        if node["async_execution"]:
+            attributes.append('style="rounded,filled,dashed"')
+        lines.append(f'  "{key}" [{", ".join(attributes)}];')
+    for key in graph["order"]:
+        node = graph["nodes"][key]
+        for dependency in graph["dependencies"][key]:
+            attributes = []
+            if (dependency, key) in critical_edges:
+                attributes.append('color="#d62728", penwidth=2')
+            if (key, dependency) in cycle_edges:
+                attributes.append('color="#d62728", style=bold, label="cycle"')
+            if node["implicit"]:
+                attributes.append('style=dotted, color="#999999"')
+            suffix = f" [{', '.join(attributes)}]" if attributes else ""
+            lines.append(f'  "{dependency}" -> "{key}"{suffix};')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def compact_summary(graph):
+    """Short markdown digest of the graph for the model context"""
+    lines = []
+    for key in graph["order"]:
+        node = graph["nodes"][key]
+        needs = ", ".join(graph["dependencies"][key]) or "nothing"
+        if node["implicit"] and graph["dependencies"][key]:
+            needs += " (implicit, previous task)"
+        mode = "async" if node["async_execution"] else "sync"
+        lines.append(f"- {key} ({mode}, ~{node['duration']:.0f}s {node['source']}) needs: {needs}")
+    if graph["critical_seconds"] is not None:
+        lines.append(f"\nCurrent schedule: ~{graph['current_seconds']:.0f}s. Critical path: "
+                     f"{' -> '.join(graph['critical_path'])} (~{graph['critical_seconds']:.0f}s).")
+    for issue in graph["issues"]:
+        lines.append(f"- Problem: {issue}")
+    for suggestion in graph["suggestions"]:
+        lines.append(f"- Suggestion: {suggestion}")
+    return "\n".join(lines)
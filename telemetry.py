@@ -0,0 +1,271 @@
+"""Span tracing and Prometheus-style metrics for the request pipeline.
+
+Disabled by default. Exporters are plugged in with `register_exporter` or from
+the environment when the module is first imported:
+
+- CREWAI_DEBUGGER_TRACE_FILE: append spans as Chrome trace events (open the
+  file in Perfetto or chrome://tracing)
+- CREWAI_DEBUGGER_METRICS_FILE: rewrite a Prometheus text exposition file
+- CREWAI_DEBUGGER_METRICS_PORT: serve the same text on http://0.0.0.0:PORT/metrics
+
+While nothing is registered, `span()` hands back a shared no-op object and
+`incr()` returns immediately, so instrumented code pays one attribute check.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_exporters = []
+_lock = threading.Lock()
+_counters = {}
+_durations = {}
+_metrics_enabled = False
+_pid = os.getpid()
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def mark(self, name):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """A timed section of the pipeline; use through `span()`"""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.marks = []
+        self.start = None
+        self.end = None
+        self.thread_id = threading.get_ident()
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.time()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _finish(self)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def mark(self, name):
+        """Record a point in time inside the span (connect, first byte, ...)"""
+        self.marks.append((name, time.time()))
+
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+
+
+def enabled():
+    return bool(_exporters) or _metrics_enabled
+
+
+def span(name, **attrs):
+    """Time a block: `with telemetry.span("api.call", model=...) as s: ...`"""
+    if not _exporters and not _metrics_enabled:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def incr(name, value=1, **labels):
+    """Add `value` to the counter `name` with the given labels"""
+    if not _metrics_enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _finish(finished_span):
+    if _metrics_enabled:
+        with _lock:
+            total, count = _durations.get(finished_span.name, (0.0, 0))
+            _durations[finished_span.name] = (total + finished_span.duration, count + 1)
+    for exporter in list(_exporters):
+        try:
+            exporter.export(finished_span)
+        except Exception:
+            # Telemetry must never break a debugging session
+            pass
+
+
+def register_exporter(exporter):
+    """Plug in an object with an `export(span)` method"""
+    _exporters.append(exporter)
+    return exporter
+
+
+def enable_metrics():
+    global _metrics_enabled
+    _metrics_enabled = True
+
+
+def reset():
+    """Drop all exporters and metric values"""
+    global _metrics_enabled
+    _exporters.clear()
+    _metrics_enabled = False
+    with _lock:
+        _counters.clear()
+        _durations.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus():
+    """Current metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = sorted(_counters.items())
+        durations = sorted(_durations.items())
+
+    lines = []
+    seen = set()
+    for (name, labels), value in counters:
+        metric = f"crewai_debugger_{name}"
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    if durations:
+        lines.append("# TYPE crewai_debugger_span_seconds summary")
+        for name, (total, count) in durations:
+            lines.append(f'crewai_debugger_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'crewai_debugger_span_seconds_count{{span="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class ChromeTraceExporter:
+    """Append spans to a Chrome trace event file (JSON array format)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The array is left unterminated; trace viewers accept that
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "w") as f:
+                f.write("[\n")
+
+    def export(self, finished_span):
+        events = [{
+            "name": finished_span.name,
+            "ph": "X",
+            "ts": int(finished_span.start * 1e6),
+            "dur": int(finished_span.duration * 1e6),
+            "pid": _pid,
+            "tid": finished_span.thread_id,
+            "args": finished_span.attrs,
+        }]
+        for mark_name, timestamp in finished_span.marks:
+            events.append({
+                "name": f"{finished_span.name}.{mark_name}",
+                "ph": "i",
+                "s": "t",
+                "ts": int(timestamp * 1e6),
+                "pid": _pid,
+                "tid": finished_span.thread_id,
+            })
+        payload = "".join(json.dumps(event, default=str) + ",\n" for event in events)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(payload)
+
+
+class PrometheusFileExporter:
+    """Rewrite a Prometheus text file after spans finish, at most every `interval` seconds"""
+
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._last_write = 0.0
+        enable_metrics()
+        atexit.register(self.flush)
+
+    def export(self, finished_span):
+        now = time.time()
+        if now - self._last_write < self.interval:
+            return
+        self._last_write = now
+        self.flush()
+
+    def flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, self.path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread"""
+    enable_metrics()
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="crewai-debugger-metrics", daemon=True).start()
+    return server
+
+
+def configure_from_env():
+    trace_file = os.environ.get("CREWAI_DEBUGGER_TRACE_FILE")
+    metrics_file = os.environ.get("CREWAI_DEBUGGER_METRICS_FILE")
+    metrics_port = os.environ.get("CREWAI_DEBUGGER_METRICS_PORT")
+
+    if trace_file:
+        register_exporter(ChromeTraceExporter(trace_file))
+    if metrics_file:
+        register_exporter(PrometheusFileExporter(metrics_file))
+    if metrics_port:
+        try:
+            start_metrics_server(int(metrics_port))
+        except OSError:
+            # Another worker in this host already serves the endpoint
+            pass
+
+
+configure_from_env()
@@ -0,0 +1,106 @@
+import ast
+
+import yaml
+
+import context_encoder
+
+TOOLS = '''"""Module docstring that goes."""
+# License banner
+# more banner
+
+import os  # inline comment
+from crewai.tools import tool
+
+
+def helper(x):
+    """Summary line.
+
+    Details that go.
+    """
+    # TODO: keep this marker
+    return x + 1
+
+
+@tool("Search")
+def search(query: str) -> str:
+    """Search the web.
+
+    The whole description is kept because CrewAI sends it to the LLM.
+    """
+    text = """
+    # not a comment, inside a string
+    """
+    return text
+'''
+
+AGENTS = '''# Agents
+researcher:   # the researcher
+  role: >
+    Senior researcher
+    # literal text inside a block scalar
+
+  goal:     Find things
+
+
+writer:
+  role: "Writer # not a comment"
+'''
+
+
+def test_python_comments_and_docstrings_are_compacted():
+    report = context_encoder.encode_file(TOOLS, "python")
+    text = report["text"]
+    assert report["encoded"] and report["saved_tokens"] > 0
+    assert "License banner" not in text and "inline comment" not in text
+    assert "Module docstring" not in text
+    assert '"""Summary line."""' in text and "Details that go" not in text
+    assert "# TODO: keep this marker" in text
+    assert "The whole description is kept" in text
+    assert "# not a comment, inside a string" in text
+
+
+def test_python_program_is_unchanged():
+    text = context_encoder.encode_file(TOOLS, "python")["text"]
+    assert context_encoder._without_docstrings(ast.parse(text)) == \
+        context_encoder._without_docstrings(ast.parse(TOOLS))
+
+
+def test_line_map_points_at_original_lines():
+    original = TOOLS.splitlines()
+    report = context_encoder.encode_file(TOOLS, "python")
+    lines = report["text"].splitlines()
+    assert len(lines) == len(report["line_map"])
+    for line, number in zip(lines, report["line_map"]):
+        if number is None:
+            assert line.startswith(context_encoder.MARKER_PREFIX)
+        else:
+            assert original[number - 1].startswith(line.split("#")[0].rstrip()[:20])
+
+
+def test_markers_give_the_next_original_line():
+    report = context_encoder.encode_file(TOOLS, "python")
+    lines = report["text"].splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith(context_encoder.MARKER_PREFIX):
+            assert int(line[len(context_encoder.MARKER_PREFIX):]) == report["line_map"][index + 1]
+
+
+def test_yaml_is_compacted_without_changing_the_document():
+    report = context_encoder.encode_file(AGENTS, "yaml")
+    assert report["encoded"]
+    assert yaml.safe_load(report["text"]) == yaml.safe_load(AGENTS)
+    assert "the researcher" not in report["text"]
+    assert "goal: Find things" in report["text"]
+    assert "# literal text inside a block scalar" in report["text"]
+
+
+def test_unparsable_files_are_sent_verbatim():
+    broken = "def broken(:\n    # comment\n    pass\n"
+    report = context_encoder.encode_file(broken, "python")
+    assert not report["encoded"]
+    assert report["text"] == broken
+    assert report["line_map"] == [1, 2, 3]
+
+
+def test_estimate_tokens_counts_words_punctuation_and_newlines():
+    assert context_encoder.estimate_tokens("a = b(1)\n") == 7
@@ -0,0 +1,75 @@
+import cost_estimator
+
+AGENTS = '''researcher:
+  role: Researcher
+  goal: Find sources
+  backstory: Curious
+  tools: [search, scrape]
+  max_iter: 5
+writer:
+  role: Writer
+  goal: Write
+  backstory: Clear
+'''
+
+
+def tasks_yaml(count, **extra):
+    lines = []
+    for number in range(count):
+        lines += [f"task{number}:", f"  description: Step {number}", "  expected_output: Text",
+                  "  agent: writer"]
+        lines += [f"  {key}: {value}" for key, value in extra.get(f"task{number}", {}).items()]
+    return "\n".join(lines) + "\n"
+
+
+def by_name(estimate):
+    return {result["name"]: result for result in estimate["tasks"]}
+
+
+def test_implicit_context_is_the_previous_task_only():
+    tasks = tasks_yaml(4, task3={"context": "[task0, task1]"})
+    results = by_name(cost_estimator.estimate_crew({"agents": AGENTS, "tasks": tasks}))
+    assert results["task0"]["context"] == []
+    assert results["task2"]["context"] == ["task1"]
+    assert not results["task2"]["explicit_context"]
+    assert results["task3"]["context"] == ["task0", "task1"]
+    assert results["task3"]["explicit_context"]
+    # Context outputs are part of every prompt
+    assert results["task3"]["input_tokens"][0] > results["task2"]["input_tokens"][0]
+
+
+def test_implicit_context_flags_are_grouped():
+    estimate = cost_estimator.estimate_crew({"agents": AGENTS, "tasks": tasks_yaml(5)})
+    implicit = [flag for flag in estimate["flags"] if "no explicit context" in flag]
+    assert implicit == ["3 tasks have no explicit context, so each only gets the previous task's output - "
+                        "list the tasks each needs (earlier outputs not passed): 'task4' (3), 'task3' (2), 'task2' (1)"]
+
+
+def test_tool_tasks_are_bounded_by_max_iter():
+    tasks = tasks_yaml(1).replace("agent: writer", "agent: researcher")
+    result = cost_estimator.estimate_crew({"agents": AGENTS, "tasks": tasks})["tasks"][0]
+    assert result["calls"] == (1 + cost_estimator.TYPICAL_TOOL_ROUNDS, 5)
+    assert result["tools"] == 2
+
+
+def test_delegation_multiplies_the_worst_case():
+    agents = AGENTS.replace("max_iter: 5", "max_iter: 5\n  allow_delegation: true")
+    tasks = tasks_yaml(1).replace("agent: writer", "agent: researcher")
+    result = cost_estimator.estimate_crew({"agents": agents, "tasks": tasks})["tasks"][0]
+    # The writer has no tools, so each delegation is one coworker call
+    assert result["calls"][1] == 5 + 5 * 1
+    assert any(note.startswith("delegation") for note in result["notes"])
+
+
+def test_hierarchical_crew_without_manager_is_flagged():
+    crew = "from crewai import Crew, Process\n\ncrew = Crew(agents=[], tasks=[], process=Process.hierarchical)\n"
+    estimate = cost_estimator.estimate_crew({"agents": AGENTS, "tasks": tasks_yaml(1), "crew": crew})
+    assert estimate["process"] == "hierarchical"
+    assert any("manager_llm" in flag for flag in estimate["flags"])
+
+
+def test_compact_summary_lists_the_costliest_tasks():
+    estimate = cost_estimator.estimate_crew({"agents": AGENTS, "tasks": tasks_yaml(4)})
+    summary = cost_estimator.compact_summary(estimate, max_tasks=2)
+    assert "- ... 2 cheaper task(s) not listed" in summary
+    assert summary.count("\n- task") == 2
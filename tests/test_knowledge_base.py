@@ -0,0 +1,95 @@
+import knowledge_base
+
+KEY_ERROR = '''Traceback (most recent call last):
+  File "/home/me/project/src/crew.py", line 10, in researcher
+    config = self.agents_config['researcher']
+  File "/usr/lib/python3.11/site-packages/crewai/project/crew_base.py", line 40, in wrapper
+    return func()
+KeyError: 'researcher'
+'''
+
+VALIDATION_ERROR = '''Traceback (most recent call last):
+  File "/app/main.py", line 5, in run
+    crew().kickoff()
+pydantic_core._pydantic_core.ValidationError: 1 validation error for Task
+expected_output
+  Field required [type=missing, input_value={'description': 'x'}, input_type=dict]
+    For further information visit https://errors.pydantic.dev/2.8/v/missing
+'''
+
+
+def test_fingerprint_keeps_user_frames_only():
+    fingerprint = knowledge_base.fingerprint_traceback(KEY_ERROR)
+    assert fingerprint["exception_type"] == "KeyError"
+    assert fingerprint["frames"] == ["crew.py:researcher"]
+    assert fingerprint["normalized_message"] == "<str>"
+
+
+def test_fingerprint_ignores_volatile_details():
+    first = knowledge_base.fingerprint_traceback(KEY_ERROR)
+    second = knowledge_base.fingerprint_traceback(
+        KEY_ERROR.replace("line 10", "line 99").replace("'researcher'", "'writer'"))
+    assert first["fingerprint"] == second["fingerprint"]
+
+
+def test_fingerprint_reads_validation_details_on_following_lines():
+    fingerprint = knowledge_base.fingerprint_traceback(VALIDATION_ERROR)
+    assert fingerprint["exception_type"] == "ValidationError"
+    assert "expected_output" in fingerprint["message"]
+    assert "For further information" not in fingerprint["message"]
+
+
+def test_fingerprint_ignores_warnings_after_the_traceback():
+    log = KEY_ERROR + "/usr/lib/python3.11/site-packages/x.py:3: UserWarning: something is deprecated\n"
+    fingerprint = knowledge_base.fingerprint_traceback(log)
+    assert fingerprint["exception_type"] == "KeyError"
+    assert fingerprint == knowledge_base.fingerprint_traceback(KEY_ERROR)
+
+
+def test_fingerprint_uses_the_last_chained_exception():
+    log = KEY_ERROR + "\nDuring handling of the above exception, another exception occurred:\n\n" \
+        + VALIDATION_ERROR
+    assert knowledge_base.fingerprint_traceback(log)["exception_type"] == "ValidationError"
+
+
+def test_fingerprint_without_exception():
+    assert knowledge_base.fingerprint_traceback("") is None
+    assert knowledge_base.fingerprint_traceback("all good\nnothing to see") is None
+
+
+def test_lookup_returns_only_resolved_diagnoses(tmp_path):
+    path = str(tmp_path / "kb.db")
+    fingerprint = knowledge_base.fingerprint_traceback(KEY_ERROR)
+    knowledge_base.record(fingerprint, "unverified analysis", path=path)
+    assert knowledge_base.lookup(fingerprint, path=path) is None
+    knowledge_base.record(fingerprint, "rename the agent key", resolved=True, path=path)
+    known = knowledge_base.lookup(fingerprint, path=path)
+    assert known["diagnosis"] == "rename the agent key"
+    assert known["exact"]
+
+
+def test_generic_message_needs_a_shared_frame(tmp_path):
+    path = str(tmp_path / "kb.db")
+    knowledge_base.record(knowledge_base.fingerprint_traceback(KEY_ERROR), "fix", resolved=True, path=path)
+    other_project = knowledge_base.fingerprint_traceback(
+        'Traceback (most recent call last):\n  File "/srv/other/tools.py", line 3, in search\n    x\nKeyError: \'q\'\n')
+    assert knowledge_base.lookup(other_project, path=path) is None
+
+
+def test_specific_message_matches_across_call_paths(tmp_path):
+    path = str(tmp_path / "kb.db")
+    knowledge_base.record(knowledge_base.fingerprint_traceback(VALIDATION_ERROR), "add expected_output",
+                          resolved=True, path=path)
+    elsewhere = knowledge_base.fingerprint_traceback(VALIDATION_ERROR.replace("main.py", "run.py"))
+    known = knowledge_base.lookup(elsewhere, path=path)
+    assert known["diagnosis"] == "add expected_output"
+    assert not known["exact"]
+
+
+def test_unwritable_store_is_skipped(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    path = str(blocker / "kb.db")
+    fingerprint = knowledge_base.fingerprint_traceback(KEY_ERROR)
+    assert knowledge_base.record(fingerprint, "fix", resolved=True, path=path) is False
+    assert knowledge_base.lookup(fingerprint, path=path) is None
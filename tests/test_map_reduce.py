@@ -0,0 +1,90 @@
+import map_reduce
+
+AGENTS = '''# Agents of the research crew
+researcher:
+  role: Researcher
+  goal: Find sources
+writer:
+  role: Writer
+  goal: Write
+'''
+
+CREW = '''from crewai import Agent, Crew, Task
+from crewai.project import CrewBase, agent, task
+
+LIMIT = 3
+
+
+@CrewBase
+class ResearchCrew:
+    """The crew"""
+
+    @agent
+    def researcher(self) -> Agent:
+        return Agent(config=self.agents_config['researcher'])
+
+    @task
+    def research(self) -> Task:
+        return Task(config=self.tasks_config['research'])
+
+
+def run():
+    ResearchCrew().crew().kickoff()
+'''
+
+
+def chunks_of(name, chunks):
+    return [chunk for chunk in chunks if chunk["file"] == name]
+
+
+def assert_contiguous(chunks, source):
+    lines = source.splitlines()
+    assert chunks[0]["start"] == 1 and chunks[-1]["end"] == len(lines)
+    for before, after in zip(chunks, chunks[1:]):
+        assert after["start"] == before["end"] + 1
+    for chunk in chunks:
+        assert chunk["text"] == "\n".join(lines[chunk["start"] - 1:chunk["end"]])
+
+
+def test_yaml_is_chunked_per_top_level_key():
+    chunks = map_reduce.chunk_files({"agents": AGENTS}, max_tokens=20)
+    assert [chunk["units"] for chunk in chunks] == [["(header)", "researcher"], ["writer"]]
+    assert_contiguous(chunks, AGENTS)
+
+
+def test_large_class_is_split_per_method():
+    chunks = map_reduce.chunk_files({"crew": CREW}, max_tokens=30)
+    units = [unit for chunk in chunks for unit in chunk["units"]]
+    assert units == ["(module code)", "class ResearchCrew", "ResearchCrew.researcher",
+                     "ResearchCrew.research", "(module code)", "run"]
+    assert_contiguous(chunks, CREW)
+
+
+def test_small_files_stay_in_one_chunk():
+    chunks = map_reduce.chunk_files({"agents": AGENTS, "crew": CREW})
+    assert [chunk["file"] for chunk in chunks] == ["agents.yaml", "crew.py"]
+    assert chunks_of("crew.py", chunks)[0]["units"] == ["(module code)", "class ResearchCrew", "(module code)", "run"]
+    assert chunks[1]["name"].startswith("crew.py: class ResearchCrew, run (lines 1-")
+
+
+def test_unit_larger_than_the_budget_is_split_by_lines():
+    source = "big:\n" + "".join(f"  key{number}: value\n" for number in range(20))
+    chunks = map_reduce.chunk_files({"tasks": source}, max_tokens=10)
+    assert len(chunks) > 1
+    assert all(unit.startswith("big (part") for chunk in chunks for unit in chunk["units"])
+    assert_contiguous(chunks, source)
+
+
+def test_needs_map_reduce(monkeypatch):
+    monkeypatch.setattr(map_reduce, "CONTEXT_BUDGET_TOKENS", 5)
+    assert not map_reduce.needs_map_reduce("a b c")
+    assert map_reduce.needs_map_reduce("a b c d e f")
+
+
+def test_outline_lists_agents_tasks_and_crew_methods():
+    tasks = "research:\n  agent: researcher\nwrite:\n  agent: writer\n  context: [research]\n"
+    outline = map_reduce.symbol_outline({"agents": AGENTS, "tasks": tasks, "crew": CREW})
+    assert "- researcher: Researcher" in outline
+    assert "- write: agent=writer | context: research" in outline
+    assert "- @agent methods: researcher@12" in outline
+    assert "- @task methods: research@16" in outline
@@ -0,0 +1,152 @@
+import pytest
+
+import context_encoder
+import patches
+
+
+def diff_block(body, path="agents.yaml"):
+    return f"```diff\n--- a/{path}\n+++ b/{path}\n{body}```"
+
+
+def test_parse_diffs_maps_paths_to_file_keys():
+    text = diff_block("@@ -1,2 +1,2 @@\n a: 1\n-b: 2\n+b: 5\n", path="config/tasks.yml")
+    parsed = patches.parse_diffs(text)
+    assert len(parsed) == 1
+    assert parsed[0]["file"] == "tasks"
+    assert parsed[0]["hunks"][0]["lines"] == [(" ", "a: 1"), ("-", "b: 2"), ("+", "b: 5")]
+
+
+def test_parse_diffs_drops_blank_line_before_closing_fence():
+    text = diff_block("@@ -1,2 +1,2 @@\n a: 1\n-b: 2\n+b: 5\n\n")
+    hunks = patches.parse_diffs(text)[0]["hunks"]
+    assert patches.apply_patch("a: 1\nb: 2\n", hunks) == "a: 1\nb: 5\n"
+
+
+def test_parse_diffs_keeps_bare_blank_context_within_declared_count():
+    text = diff_block("@@ -1,3 +1,3 @@\n a: 1\n\n-b: 2\n+b: 5\n")
+    hunks = patches.parse_diffs(text)[0]["hunks"]
+    assert patches.apply_patch("a: 1\n\nb: 2\n", hunks) == "a: 1\n\nb: 5\n"
+
+
+def test_parse_diffs_ignores_unknown_blocks():
+    assert patches.parse_diffs("```python\nprint(1)\n```") == []
+
+
+def test_apply_patch_tolerates_shifted_line_numbers():
+    source = "".join(f"line {number}\n" for number in range(1, 21))
+    hunks = patches.parse_diffs(diff_block("@@ -5,2 +5,2 @@\n line 12\n-line 13\n+line thirteen\n"))[0]["hunks"]
+    assert "line thirteen\nline 14" in patches.apply_patch(source, hunks)
+
+
+def test_apply_patch_pure_insertion():
+    hunks = patches.parse_diffs(diff_block("@@ -1,0 +2,1 @@\n+b: 2\n"))[0]["hunks"]
+    assert patches.apply_patch("a: 1\nc: 3\n", hunks) == "a: 1\nb: 2\nc: 3\n"
+
+
+def test_apply_patch_rejects_context_that_does_not_match():
+    hunks = patches.parse_diffs(diff_block("@@ -1,1 +1,1 @@\n-missing: 1\n+b: 2\n"))[0]["hunks"]
+    with pytest.raises(patches.PatchError):
+        patches.apply_patch("a: 1\n", hunks)
+
+
+TOOLS = '''# Copyright 2024 Someone
+# Licensed under MIT
+
+
+import os
+
+# helper constant
+LIMIT = 10
+
+
+def helper(x):
+    """Do a thing.
+
+    Longer explanation.
+    """
+    # add
+    return x + LIMIT  # inline
+'''
+
+COMPACTED_DIFF = '''@@ -11,4 +11,4 @@
+ def helper(x):
+     """Do a thing."""
+ #@18
+-    return x + LIMIT
++    return x - LIMIT
+'''
+
+
+def test_process_answer_applies_diffs_against_compacted_text():
+    assert context_encoder.encode_file(TOOLS, "python")["encoded"]
+    answer = diff_block(COMPACTED_DIFF, path="tools.py")
+
+    assert not patches.process_answer(answer, {"tools": TOOLS})[0]["ok"]
+    result = patches.process_answer(answer, {"tools": TOOLS}, compacted=True)[0]
+    assert result["ok"], result["errors"]
+    # Only the changed line differs; the other stripped comments and the full docstring are kept
+    assert result["text"] == TOOLS.replace("return x + LIMIT  # inline", "return x - LIMIT")
+
+
+def test_apply_patch_compacted_without_markers():
+    report = context_encoder.encode_file(TOOLS, "python")
+    hunks = patches.parse_diffs(diff_block(COMPACTED_DIFF.replace(" #@18\n", ""), path="tools.py"))[0]["hunks"]
+    patched = patches.apply_patch_compacted(TOOLS, report["text"], report["line_map"], hunks)
+    assert patched == TOOLS.replace("return x + LIMIT  # inline", "return x - LIMIT")
+
+
+def test_process_answer_reports_validation_errors():
+    answer = diff_block("@@ -1,1 +1,1 @@\n-x = 1\n+x = (\n", path="main.py")
+    result = patches.process_answer(answer, {"main": "x = 1\n"})[0]
+    assert not result["ok"]
+    assert "SyntaxError" in result["errors"][0]
+
+
+def test_process_answer_rejects_files_that_were_not_uploaded():
+    answer = diff_block("@@ -1,1 +1,1 @@\n-x = 1\n+x = 2\n", path="tools.py")
+    result = patches.process_answer(answer, {"main": "x = 1\n"})[0]
+    assert not result["ok"]
+    assert "was not uploaded" in result["errors"][0]
+
+
+CREW = '''from crewai import Agent, Crew
+from crewai.project import CrewBase, agent
+
+
+@CrewBase
+class ResearchCrew:
+    @agent
+    def writer(self) -> Agent:
+        return Agent(config=self.agents_config['writer'])
+'''
+
+
+def test_existing_issue_on_shifted_line_is_not_new():
+    files = {"agents": "researcher:\n  role: r\n  goal: g\n  backstory: b\n", "crew": CREW}
+    answer = diff_block("@@ -1,1 +1,2 @@\n from crewai import Agent, Crew\n+import os\n", path="crew.py")
+    result = patches.process_answer(answer, files)[0]
+    assert result["ok"], result["errors"]
+
+
+def test_second_copy_of_an_issue_is_new():
+    files = {"agents": "researcher:\n  role: r\n  goal: g\n  backstory: b\n", "crew": CREW}
+    answer = diff_block(
+        "@@ -9,1 +9,4 @@\n"
+        "         return Agent(config=self.agents_config['writer'])\n"
+        "+\n"
+        "+    def editor(self) -> Agent:\n"
+        "+        return Agent(config=self.agents_config['writer'])\n", path="crew.py")
+    result = patches.process_answer(answer, files)[0]
+    assert not result["ok"]
+    assert result["errors"][0].startswith("new issue: crew.py:12:")
+
+
+def test_results_record_the_file_they_were_built_from():
+    files = {"main": "x = 1\n"}
+    answer = diff_block("@@ -1,1 +1,1 @@\n-x = 1\n+x = 2\n", path="main.py") + "\n" + \
+        diff_block("@@ -1,1 +1,1 @@\n-x = 2\n+x = 3\n", path="main.py")
+    results = patches.process_answer(answer, files)
+    assert [result["ok"] for result in results] == [True, True]
+    # Chained patches in one answer still refer to the uploaded file
+    assert {result["base"] for result in results} == {patches.digest("x = 1\n")}
+    assert results[-1]["text"] == "x = 3\n"
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+import state_store
+
+
+@pytest.fixture
+def resp_server():
+    server = state_store.RespStandInServer(("127.0.0.1", 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return state_store.MemoryBackend()
+    if request.param == "sqlite":
+        return state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    server = request.getfixturevalue("resp_server")
+    return state_store.RedisBackend(port=server.server_address[1])
+
+
+def test_set_get_delete(backend):
+    assert backend.get("missing") is None
+    backend.set("key", {"history": [1, "two"]})
+    assert backend.get("key") == {"history": [1, "two"]}
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_add_only_sets_absent_keys(backend):
+    assert backend.add("lease", "worker-1", ttl=10)
+    assert not backend.add("lease", "worker-2", ttl=10)
+    assert backend.get("lease") == "worker-1"
+
+
+def test_incr_counts_from_amount(backend):
+    assert backend.incr("rate", ttl=60) == 1
+    assert backend.incr("rate", 4, ttl=60) == 5
+
+
+def test_entries_expire(backend):
+    backend.set("short", "value", ttl=0.05)
+    assert backend.add("lease", "worker-1", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.add("lease", "worker-2", ttl=10)
+    assert backend.incr("short", ttl=10) == 1
+
+
+def test_memory_backend_purges_keys_that_are_never_read(monkeypatch):
+    monkeypatch.setattr(state_store, "PURGE_INTERVAL", 0)
+    backend = state_store.MemoryBackend()
+    backend.incr("rate:session:1", ttl=0.01)
+    time.sleep(0.02)
+    backend.set("other", 1)
+    assert list(backend._data) == ["other"]
+
+
+def test_sqlite_backend_purges_keys_that_are_never_read(monkeypatch, tmp_path):
+    monkeypatch.setattr(state_store, "PURGE_INTERVAL", 0)
+    backend = state_store.SQLiteBackend(str(tmp_path / "state.db"))
+    backend.incr("rate:session:1", ttl=0.01)
+    time.sleep(0.02)
+    backend.set("other", 1)
+    assert backend._connect().execute("SELECT key FROM kv").fetchall() == [("other",)]
+
+
+def test_only_memory_backend_is_process_local(tmp_path):
+    assert not state_store.MemoryBackend().shared
+    assert state_store.SQLiteBackend(str(tmp_path / "state.db")).shared
+    assert state_store.RedisBackend().shared
+
+
+def test_redis_backend_reconnects_after_dropped_connection(resp_server):
+    backend = state_store.RedisBackend(port=resp_server.server_address[1])
+    backend.set("key", 1)
+    sock, _ = backend._local.conn
+    sock.close()
+    assert backend.get("key") == 1
+
+
+def test_resp_error_reply(resp_server):
+    backend = state_store.RedisBackend(port=resp_server.server_address[1])
+    with pytest.raises(state_store.RespError):
+        backend._command("FLUSHALL")
+
+
+def test_backend_from_url(tmp_path):
+    assert isinstance(state_store.backend_from_url(None), state_store.MemoryBackend)
+    assert isinstance(state_store.backend_from_url("memory://"), state_store.MemoryBackend)
+    sqlite_backend = state_store.backend_from_url(f"sqlite:///{tmp_path}/state.db")
+    assert isinstance(sqlite_backend, state_store.SQLiteBackend)
+    assert sqlite_backend.path == f"{tmp_path}/state.db"
+    redis_backend = state_store.backend_from_url("redis://:secret@cache:6390/2")
+    assert (redis_backend.host, redis_backend.port, redis_backend.db, redis_backend.password) == \
+        ("cache", 6390, 2, "secret")
+    with pytest.raises(ValueError):
+        state_store.backend_from_url("ftp://host")
+
+
+def test_redis_incr_sets_ttl_in_one_transaction(resp_server):
+    backend = state_store.RedisBackend(port=resp_server.server_address[1])
+    assert backend.incr("rate", ttl=0.05) == 1
+    assert backend.incr("rate", ttl=0.05) == 2
+    with resp_server.store._lock:
+        assert resp_server.store._data["rate"][1] is not None
+    time.sleep(0.1)
+    assert backend.incr("rate", ttl=10) == 1
+
+
+def test_redis_incr_counts_once_after_dropped_connection(resp_server):
+    backend = state_store.RedisBackend(port=resp_server.server_address[1])
+    backend.incr("rate", ttl=60)
+    sock, _ = backend._local.conn
+    sock.close()
+    assert backend.incr("rate", ttl=60) == 2
+    assert backend.get("rate") == 2
+
+
+def test_redis_pipeline_errors_leave_connection_usable(resp_server):
+    backend = state_store.RedisBackend(port=resp_server.server_address[1])
+    with pytest.raises(state_store.RespError):
+        backend._send(("PING",), ("FLUSHALL",), ("PING",))
+    backend.set("key", 1)
+    assert backend.get("key") == 1
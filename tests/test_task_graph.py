@@ -0,0 +1,55 @@
+import task_graph
+
+TASKS = '''research:
+  description: Research {topic}
+  expected_output: Notes
+  agent: researcher
+write:
+  description: Write the report
+  expected_output: Report
+  agent: writer
+  context: [research]
+'''
+
+
+def test_measured_duration_is_the_mean_of_all_runs():
+    profile = {"task_totals": {"Research AI": {"runs": 2, "duration": 30.0},
+                               "write": {"runs": 1, "duration": 5.0}}}
+    graph = task_graph.build_graph({"tasks": TASKS}, profile=profile)
+    assert graph["nodes"]["research"]["duration"] == 15.0
+    assert graph["nodes"]["research"]["source"] == "measured"
+    assert graph["critical_seconds"] == 20.0
+
+
+def test_implicit_edge_is_only_from_the_previous_task():
+    tasks = "a:\n  description: A\nb:\n  description: B\nc:\n  description: C\n"
+    graph = task_graph.build_graph({"tasks": tasks})
+    assert graph["dependencies"] == {"a": [], "b": ["a"], "c": ["b"]}
+    assert [graph["nodes"][key]["implicit"] for key in "abc"] == [False, True, True]
+    assert "needs: b (implicit, previous task)" in task_graph.compact_summary(graph)
+    assert any(suggestion.startswith("No explicit context on 'b', 'c'") for suggestion in graph["suggestions"])
+    edges = [line for line in task_graph.to_dot(graph).splitlines() if "->" in line]
+    assert len(edges) == 2 and all("style=dotted" in edge for edge in edges)
+
+
+def test_independent_tasks_can_run_concurrently():
+    tasks = ("a:\n  description: A\n  context: []\n"
+             "b:\n  description: B\n  context: []\n"
+             "c:\n  description: C\n  context: [a, b]\n")
+    profile = {"task_totals": {name: {"runs": 1, "duration": 10.0} for name in "abc"}}
+    graph = task_graph.build_graph({"tasks": tasks}, profile=profile)
+    assert graph["current_seconds"] == 30.0
+    assert graph["critical_seconds"] == 20.0
+    assert graph["critical_path"][-1] == "c" and len(graph["critical_path"]) == 2
+    assert any("set async_execution: true" in suggestion for suggestion in graph["suggestions"])
+
+    async_tasks = tasks.replace("context: []", "context: []\n  async_execution: true")
+    assert task_graph.build_graph({"tasks": async_tasks}, profile=profile)["current_seconds"] == 20.0
+
+
+def test_circular_context_is_reported():
+    tasks = "a:\n  description: A\n  context: [b]\nb:\n  description: B\n  context: [a]\n"
+    graph = task_graph.build_graph({"tasks": tasks})
+    assert graph["cycle"] == ["a", "b", "a"]
+    assert graph["issues"][0] == "Circular context: a -> b -> a"
+    assert graph["critical_seconds"] is None
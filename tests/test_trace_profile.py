@@ -0,0 +1,77 @@
+import json
+
+import trace_profile
+
+VERBOSE = '''2024-05-01 10:00:00 # Agent: Researcher
+2024-05-01 10:00:00 ## Task: Find sources
+2024-05-01 10:00:01 ## Using tool: search
+2024-05-01 10:00:01 ## Tool Input: {"query": "crewai"}
+2024-05-01 10:00:03 ## Task: Find sources
+2024-05-01 10:00:04 ## Using tool: search
+2024-05-01 10:00:04 ## Tool Input: {"query": "crewai"}
+2024-05-01 10:00:06 ## Final Answer: done
+2024-05-01 10:00:06 # Agent: Writer
+2024-05-01 10:00:06 ## Task: Write report
+2024-05-01 10:00:09 ## Final Answer: report
+'''
+
+
+def profile_of(lines):
+    return trace_profile.profile_stream(iter(lines))
+
+
+def event(kind, timestamp, **data):
+    return json.dumps({"type": kind, "timestamp": timestamp, "data": data})
+
+
+def test_verbose_log_timings_and_tool_calls():
+    profile = profile_of(VERBOSE.splitlines())
+    assert profile["timed"] and profile["wall_time"] == 9
+    # The repeated task header is the same task, not a new run
+    assert [task["name"] for task in profile["tasks"]] == ["Find sources", "Write report"]
+    assert [task["duration"] for task in profile["tasks"]] == [6, 3]
+    assert profile["tools"]["search"]["calls"] == 2
+    assert profile["agents"]["Researcher"]["tasks"] == 1
+
+
+def test_json_events_in_any_naming_style():
+    profile = profile_of([
+        event("task_started", 0, task_name="Find sources", agent_role="Researcher"),
+        event("LLMCallStartedEvent", 1, agent_role="Researcher"),
+        event("LLMCallCompletedEvent", 3, agent_role="Researcher"),
+        event("ToolUsageStartedEvent", 3, agent_role="Researcher", tool_name="search", tool_args="q"),
+        event("ToolUsageErrorEvent", 5, agent_role="Researcher", tool_name="search"),
+        event("task_completed", 6, agent_role="Researcher"),
+    ])
+    assert profile["llm"] == {"calls": 1, "failures": 0, "duration": 2}
+    assert profile["tools"]["search"] == {"calls": 1, "errors": 1, "duration": 2}
+    assert profile["tasks"][0]["status"] == "completed"
+
+
+def test_max_iter_counts_only_real_signals():
+    profile = profile_of([
+        event("task_started", 0, task_name="Find sources", agent={"role": "Researcher", "max_iter": 25}),
+        event("tool_usage_started", 1, tool_name="search", tool_args="max_iter docs"),
+        json.dumps({"type": "log", "timestamp": 2, "message": "Maximum iterations reached. Requesting final answer."}),
+        event("AgentMaxIterationsReachedEvent", 3),
+        "Agent config: max_iter=25",
+    ])
+    assert len(profile["max_iter_hits"]) == 2
+    assert profile["max_iter_hits"][0]["task"] == "Find sources"
+
+
+def test_repeated_tool_inputs_are_reported():
+    lines = ["## Using tool: search", '## Tool Input: {"query": "same"}'] * trace_profile.REPEATED_CALL_THRESHOLD
+    profile = profile_of(lines)
+    assert profile["repeated_tool_calls"][0]["count"] == trace_profile.REPEATED_CALL_THRESHOLD
+
+
+def test_task_totals_cover_runs_beyond_the_listed_tasks(monkeypatch):
+    monkeypatch.setattr(trace_profile, "MAX_PROFILE_TASKS", 2)
+    lines = []
+    for run in range(3):
+        lines += [event("task_started", 100 + run * 10, task_name="Find sources"),
+                  event("task_completed", 100 + run * 10 + 4)]
+    profile = profile_of(lines)
+    assert profile["task_count"] == 3 and len(profile["tasks"]) == 2
+    assert profile["task_totals"] == {"Find sources": {"runs": 3, "duration": 12}}
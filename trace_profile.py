@@ -0,0 +1,453 @@
+"""Execution profile from CrewAI run logs and event traces.
+
+Feeds lines one at a time, so multi-megabyte verbose logs and JSONL event
+traces are parsed without holding them in memory. Two inputs are understood:
+
+- JSON lines from CrewAI's event bus or a custom listener (task_started,
+  tool_usage_finished, llm_call_completed, ... in any naming style)
+- verbose console output ("# Agent:", "## Task:", "## Using tool:",
+  "Action:", "== Working Agent:"), with durations when lines carry
+  timestamps
+
+The result is a plain dict (timings per task, agent and tool, loops and
+repeated tool calls) that can be shown in the UI and condensed by
+`compact_summary` into a few hundred tokens of model context.
+"""
+import hashlib
+import json
+import re
+from datetime import datetime
+
+MAX_TRACKED_TOOL_INPUTS = 10000
+REPEATED_CALL_THRESHOLD = 3
+MAX_TIMELINE_EVENTS = 500
+# Task runs listed in the profile; multi-run logs can hold tens of thousands, totals cover all of them
+MAX_PROFILE_TASKS = 200
+MAX_TASK_NAMES = 1000
+
+_ANSI_RE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_TIMESTAMP_RE = re.compile(
+    r"^\s*\[?(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?)(?:Z|[+-]\d{2}:?\d{2})?\]?\s*"
+)
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+_VERBOSE_PATTERNS = [
+    ("agent", re.compile(r"(?:^#\s*Agent:|Working Agent:|🤖\s*Agent:)\s*(?P<value>.+)", re.IGNORECASE)),
+    ("task_start", re.compile(r"(?:^##\s*Task:|Starting Task:|📋\s*Task:)\s*(?P<value>.+)", re.IGNORECASE)),
+    ("task_end", re.compile(r"(?:^##\s*Final Answer:|Task output:|✅\s*Task Completed|Task Completed)", re.IGNORECASE)),
+    ("tool_call", re.compile(r"(?:^##\s*Using tool:|^Action:|Using Tool:)\s*(?P<value>.+)", re.IGNORECASE)),
+    ("tool_input", re.compile(r"(?:^##\s*Tool Input:|^Action Input:)\s*(?P<value>.*)", re.IGNORECASE)),
+    ("tool_error", re.compile(r"Tool Usage Failed|Error executing tool|error while trying to use the tool", re.IGNORECASE)),
+    ("thought", re.compile(r"^(?:##\s*)?Thought:", re.IGNORECASE)),
+    ("max_iter", re.compile(r"Maximum iterations reached|iteration limit reached", re.IGNORECASE)),
+    ("retry", re.compile(r"Retrying|RateLimitError|\b429\b|rate limit", re.IGNORECASE)),
+]
+
+# Normalized event names from JSON traces
+_JSON_KINDS = {
+    "task_started": "task_start",
+    "task_completed": "task_end",
+    "task_failed": "task_end",
+    "agent_execution_started": "agent",
+    "tool_usage_started": "tool_call",
+    "tool_usage_finished": "tool_end",
+    "tool_usage_error": "tool_error",
+    "llm_call_started": "llm_start",
+    "llm_call_completed": "llm_end",
+    "llm_call_failed": "llm_error",
+}
+# Fields of a JSON event that carry log text; config values such as max_iter=25 are not signals
+_MESSAGE_KEYS = ("message", "msg", "text", "error", "output")
+_MAX_ITER_TEXT_RE = re.compile(r"Maximum iterations reached", re.IGNORECASE)
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        # Milliseconds since the epoch are common in JS-style exporters
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00").replace(",", ".")).timestamp()
+    except ValueError:
+        return None
+
+
+def _event_name(raw):
+    name = _CAMEL_RE.sub("_", str(raw)).lower()
+    name = re.sub(r"[^a-z0-9]+", "_", name).strip("_")
+    if name.endswith("_event"):
+        name = name[:-6]
+    return name
+
+
+def _name_of(value, *keys):
+    if isinstance(value, dict):
+        for key in keys:
+            if value.get(key):
+                return str(value[key])
+        return None
+    return str(value) if value else None
+
+
+def _is_max_iter(name, event, payload):
+    """Whether a JSON event reports an agent hitting max_iter, by its type or its message text"""
+    if "max_iter" in name:
+        return True
+    for record in (event, payload):
+        for key in _MESSAGE_KEYS:
+            value = record.get(key)
+            if isinstance(value, str) and _MAX_ITER_TEXT_RE.search(value):
+                return True
+    return False
+
+
+class TraceProfiler:
+    """Incrementally builds an execution profile from log or trace lines"""
+
+    def __init__(self):
+        self.lines = 0
+        self.events = 0
+        self.first_time = None
+        self.last_time = None
+        self.timed = False
+        self.tasks = []
+        self.agents = {}
+        self.tools = {}
+        self.llm = {"calls": 0, "failures": 0, "duration": 0.0}
+        self.retries = 0
+        self.max_iter_hits = []
+        self.timeline = []
+        self._current_task = None
+        self._current_agent = None
+        self._pending_tool = None
+        self._tool_starts = {}
+        self._llm_starts = {}
+        self._tool_inputs = {}
+        self._expect_tool_input = False
+
+    # -- bookkeeping -----------------------------------------------------
+
+    def _agent(self, role):
+        role = role or "unknown agent"
+        if role not in self.agents:
+            self.agents[role] = {"tasks": 0, "iterations": 0, "tool_calls": 0, "llm_calls": 0, "duration": 0.0}
+        return self.agents[role]
+
+    def _tool(self, name):
+        if name not in self.tools:
+            self.tools[name] = {"calls": 0, "errors": 0, "duration": 0.0}
+        return self.tools[name]
+
+    def _record(self, kind, timestamp, **details):
+        self.events += 1
+        if timestamp is not None:
+            self.timed = True
+            if self.first_time is None:
+                self.first_time = timestamp
+            self.last_time = timestamp
+        if len(self.timeline) < MAX_TIMELINE_EVENTS:
+            self.timeline.append({"t": timestamp, "kind": kind, **details})
+
+    def _start_task(self, name, agent, timestamp):
+        # Verbose logs repeat the task header on some steps; that is not a new task
+        if self._current_task is not None and self._current_task["name"] == name.strip():
+            return
+        self._end_task(timestamp)
+        if agent:
+            self._current_agent = agent
+        task = {
+            "name": name.strip(),
+            "agent": self._current_agent,
+            "start": timestamp,
+            "end": None,
+            "duration": None,
+            "tool_calls": 0,
+            "llm_calls": 0,
+            "iterations": 0,
+            "status": "running",
+        }
+        self.tasks.append(task)
+        self._current_task = task
+        self._agent(task["agent"])["tasks"] += 1
+        self._record("task_start", timestamp, task=task["name"], agent=task["agent"])
+
+    def _end_task(self, timestamp, status="completed"):
+        task = self._current_task
+        if task is None:
+            return
+        task["end"] = timestamp
+        task["status"] = status
+        if timestamp is not None and task["start"] is not None:
+            task["duration"] = max(timestamp - task["start"], 0.0)
+            self._agent(task["agent"])["duration"] += task["duration"]
+        self._current_task = None
+        self._record("task_end", timestamp, task=task["name"], status=status)
+
+    def _tool_call(self, name, tool_input, timestamp):
+        name = name.strip().strip("`'\"") or "unknown tool"
+        self._tool(name)["calls"] += 1
+        self._agent(self._current_agent)["tool_calls"] += 1
+        if self._current_task is not None:
+            self._current_task["tool_calls"] += 1
+        self._record("tool_call", timestamp, tool=name, agent=self._current_agent)
+        self._pending_tool = name
+        if tool_input is not None:
+            self._tool_input(name, tool_input)
+
+    def _tool_input(self, name, tool_input):
+        normalized = re.sub(r"\s+", " ", str(tool_input)).strip()
+        digest = hashlib.sha1(f"{name}|{normalized}".encode("utf-8")).hexdigest()
+        if digest in self._tool_inputs:
+            self._tool_inputs[digest]["count"] += 1
+        elif len(self._tool_inputs) < MAX_TRACKED_TOOL_INPUTS:
+            self._tool_inputs[digest] = {"tool": name, "input": normalized[:120], "count": 1,
+                                         "agent": self._current_agent}
+
+    def _iteration(self, timestamp):
+        self._agent(self._current_agent)["iterations"] += 1
+        if self._current_task is not None:
+            self._current_task["iterations"] += 1
+
+    def _max_iter(self, timestamp):
+        self.max_iter_hits.append({
+            "agent": self._current_agent,
+            "task": self._current_task["name"] if self._current_task else None,
+        })
+        self._record("max_iter", timestamp, agent=self._current_agent)
+
+    # -- input formats ---------------------------------------------------
+
+    def feed(self, line):
+        """Consume one line of a verbose log or JSONL trace"""
+        self.lines += 1
+        stripped = line.strip()
+        if not stripped:
+            return
+        if stripped.startswith("{") and stripped.endswith("}"):
+            try:
+                event = json.loads(stripped)
+            except ValueError:
+                event = None
+            if isinstance(event, dict):
+                self._feed_event(event)
+                return
+        self._feed_verbose(stripped)
+
+    def _feed_event(self, event):
+        payload = event.get("data") if isinstance(event.get("data"), dict) else event
+        raw_name = event.get("type") or event.get("event") or event.get("event_type") or event.get("name")
+        name = _event_name(raw_name) if raw_name else ""
+        timestamp = _parse_time(event.get("timestamp") or event.get("time") or event.get("ts")
+                                or payload.get("timestamp"))
+        if _is_max_iter(name, event, payload):
+            self._max_iter(timestamp)
+        kind = _JSON_KINDS.get(name)
+        if kind is None:
+            return
+        agent = (_name_of(payload.get("agent_role"))
+                 or _name_of(payload.get("agent"), "role", "name"))
+        if agent:
+            self._current_agent = agent
+
+        if kind == "task_start":
+            name = (_name_of(payload.get("task_name"))
+                    or _name_of(payload.get("task"), "name", "description") or "unnamed task")
+            self._start_task(name, agent, timestamp)
+        elif kind == "task_end":
+            failed = "fail" in name
+            self._end_task(timestamp, status="failed" if failed else "completed")
+        elif kind == "agent":
+            self._record("agent", timestamp, agent=agent)
+        elif kind == "tool_call":
+            name = _name_of(payload.get("tool_name")) or _name_of(payload.get("tool"), "name") or "unknown tool"
+            self._tool_call(name, payload.get("tool_args") or payload.get("input"), timestamp)
+            self._tool_starts[(agent, name)] = timestamp
+        elif kind in ("tool_end", "tool_error"):
+            name = _name_of(payload.get("tool_name")) or _name_of(payload.get("tool"), "name") or "unknown tool"
+            started = self._tool_starts.pop((agent, name), None)
+            if started is not None and timestamp is not None:
+                self._tool(name)["duration"] += max(timestamp - started, 0.0)
+            if kind == "tool_error":
+                self._tool(name)["errors"] += 1
+                self._record("tool_error", timestamp, tool=name, agent=agent)
+        elif kind == "llm_start":
+            self.llm["calls"] += 1
+            self._agent(self._current_agent)["llm_calls"] += 1
+            if self._current_task is not None:
+                self._current_task["llm_calls"] += 1
+            self._iteration(timestamp)
+            self._llm_starts[agent] = timestamp
+            self._record("llm_call", timestamp, agent=agent)
+        elif kind in ("llm_end", "llm_error"):
+            started = self._llm_starts.pop(agent, None)
+            if started is not None and timestamp is not None:
+                self.llm["duration"] += max(timestamp - started, 0.0)
+            if kind == "llm_error":
+                self.llm["failures"] += 1
+                self.retries += 1
+
+    def _feed_verbose(self, line):
+        line = _ANSI_RE.sub("", line)
+        timestamp = None
+        match = _TIMESTAMP_RE.match(line)
+        if match:
+            timestamp = _parse_time(match.group(1))
+            line = line[match.end():]
+            # Old-style "[DEBUG]: == ..." prefixes
+            line = re.sub(r"^\[\w+\]:?\s*(==\s*)?", "", line)
+        line = line.strip("│╭╰─ ").strip()
+        if not line:
+            return
+
+        if self._expect_tool_input:
+            self._expect_tool_input = False
+            if self._pending_tool:
+                self._tool_input(self._pending_tool, line)
+                return
+
+        for kind, pattern in _VERBOSE_PATTERNS:
+            found = pattern.search(line)
+            if not found:
+                continue
+            value = found.groupdict().get("value")
+            if kind == "agent":
+                self._current_agent = value.strip()
+                self._agent(self._current_agent)
+                self._record("agent", timestamp, agent=self._current_agent)
+            elif kind == "task_start":
+                self._start_task(value, None, timestamp)
+            elif kind == "task_end":
+                self._iteration(timestamp)
+                self._end_task(timestamp)
+            elif kind == "tool_call":
+                self._iteration(timestamp)
+                self._tool_call(value, None, timestamp)
+            elif kind == "tool_input":
+                if value.strip():
+                    self._tool_input(self._pending_tool or "unknown tool", value)
+                else:
+                    self._expect_tool_input = True
+            elif kind == "tool_error":
+                self._tool(self._pending_tool or "unknown tool")["errors"] += 1
+                self._record("tool_error", timestamp, tool=self._pending_tool)
+            elif kind == "thought":
+                self._iteration(timestamp)
+            elif kind == "max_iter":
+                self._max_iter(timestamp)
+            elif kind == "retry":
+                self.retries += 1
+                self._record("retry", timestamp)
+            return
+
+        if timestamp is not None:
+            self._record("line", timestamp)
+
+    # -- results ---------------------------------------------------------
+
+    def profile(self):
+        """Finish open spans and return the profile as a JSON-serializable dict"""
+        if self._current_task is not None:
+            self._end_task(self.last_time, status="unfinished")
+
+        repeated = sorted(
+            (entry for entry in self._tool_inputs.values() if entry["count"] >= REPEATED_CALL_THRESHOLD),
+            key=lambda entry: entry["count"], reverse=True
+        )[:10]
+
+        hot_spots = []
+        timed_tasks = [task for task in self.tasks if task["duration"] is not None]
+        wall_time = (self.last_time - self.first_time) if self.timed and self.first_time is not None else None
+        if timed_tasks and wall_time:
+            slowest = max(timed_tasks, key=lambda task: task["duration"])
+            share = slowest["duration"] / wall_time if wall_time else 0
+            hot_spots.append(f"Task '{slowest['name']}' took {slowest['duration']:.1f}s ({share:.0%} of the run)")
+        for name, tool in sorted(self.tools.items(), key=lambda item: item[1]["duration"], reverse=True)[:3]:
+            if tool["duration"]:
+                hot_spots.append(f"Tool '{name}' spent {tool['duration']:.1f}s over {tool['calls']} call(s)")
+        for name, tool in self.tools.items():
+            if tool["errors"]:
+                hot_spots.append(f"Tool '{name}' failed {tool['errors']} of {tool['calls']} call(s)")
+        looping = [task for task in self.tasks if task["iterations"] >= 10]
+        for task in sorted(looping, key=lambda task: task["iterations"], reverse=True)[:5]:
+            hot_spots.append(f"Task '{task['name']}' needed {task['iterations']} agent iterations")
+        if len(looping) > 5:
+            hot_spots.append(f"{len(looping) - 5} more task run(s) needed 10 or more agent iterations")
+        for entry in repeated:
+            hot_spots.append(f"Tool '{entry['tool']}' was called {entry['count']} times with the same input")
+        if self.max_iter_hits:
+            hot_spots.append(f"Agents hit max_iter {len(self.max_iter_hits)} time(s)")
+        if self.retries:
+            hot_spots.append(f"{self.retries} retry / rate-limit event(s)")
+
+        task_totals = {}
+        for task in self.tasks:
+            if task["name"] not in task_totals and len(task_totals) >= MAX_TASK_NAMES:
+                continue
+            totals = task_totals.setdefault(task["name"], {"runs": 0, "duration": None})
+            totals["runs"] += 1
+            if task["duration"] is not None:
+                totals["duration"] = (totals["duration"] or 0.0) + task["duration"]
+
+        return {
+            "lines": self.lines,
+            "events": self.events,
+            "timed": self.timed,
+            "wall_time": wall_time,
+            "task_count": len(self.tasks),
+            "tasks": self.tasks[:MAX_PROFILE_TASKS],
+            "task_totals": task_totals,
+            "agents": self.agents,
+            "tools": self.tools,
+            "llm": self.llm,
+            "retries": self.retries,
+            "max_iter_hits": self.max_iter_hits[:20],
+            "repeated_tool_calls": repeated,
+            "hot_spots": hot_spots,
+            "timeline": self.timeline,
+        }
+
+
+def profile_stream(stream, progress=None, every=20000):
+    """Profile a text stream line by line; `progress(lines)` is called every `every` lines"""
+    profiler = TraceProfiler()
+    for line in stream:
+        profiler.feed(line)
+        if progress is not None and profiler.lines % every == 0:
+            progress(profiler.lines)
+    return profiler.profile()
+
+
+def _seconds(value):
+    return f"{value:.1f}s" if value is not None else "n/a"
+
+
+def compact_summary(profile, max_tasks=15):
+    """A short markdown digest of the profile for the model context"""
+    lines = [f"Parsed locally from a {profile['lines']:,}-line run log ({profile['events']:,} events)."]
+    if profile["wall_time"] is not None:
+        lines.append(f"Wall time: {_seconds(profile['wall_time'])}. LLM calls: {profile['llm']['calls']} "
+                     f"({_seconds(profile['llm']['duration']) if profile['llm']['duration'] else 'untimed'}).")
+    elif not profile["timed"]:
+        lines.append("The log has no timestamps, so only counts are available.")
+
+    if profile["tasks"]:
+        lines.append("\nTasks (in run order):")
+        for task in profile["tasks"][:max_tasks]:
+            lines.append(f"- {task['name'][:80]} | agent: {task['agent'] or '?'} | {_seconds(task['duration'])} | "
+                         f"iterations: {task['iterations']} | tool calls: {task['tool_calls']} | {task['status']}")
+        if profile["task_count"] > max_tasks:
+            lines.append(f"- ... {profile['task_count'] - max_tasks} more task run(s)")
+
+    if profile["tools"]:
+        busiest = sorted(profile["tools"].items(), key=lambda item: (item[1]["duration"], item[1]["calls"]), reverse=True)[:8]
+        lines.append("\nTools: " + "; ".join(
+            f"{name} x{tool['calls']}" + (f" ({_seconds(tool['duration'])})" if tool["duration"] else "")
+            + (f", {tool['errors']} errors" if tool["errors"] else "")
+            for name, tool in busiest
+        ))
+
+    if profile["hot_spots"]:
+        lines.append("\nHot spots:")
+        lines.extend(f"- {spot}" for spot in profile["hot_spots"][:10])
+    return "\n".join(lines)